@@ -1,10 +1,16 @@
+import matplotlib
+matplotlib.use('Agg')  # figuras só em arquivo, sem janela
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 import os
 
 from src.data_generator import generate_and_save
 from src.utils import load_data
-from src.ga_core import run_ga, run_ga_grid_search
+from src.ga_core import (
+    run_ga, run_ga_grid_search, build_attribute_matrix, population_totals, fitness_from_totals,
+    REVENUE, COST, WATER, FERT, RISK
+)
 
 # 1. Gerar dados realistas
 generate_and_save(path='data/farm_data_seed42.csv', N=100, seed=42)
@@ -27,37 +33,24 @@ best, res = run_ga(
 print(f"\nMelhor fitness: {res['best_fitness']}")
 print(f"Tempo de execução: {res['time_seconds']:.3f} segundos")
 
-# 5. Estatísticas das áreas selecionadas
-selected_idx = [i for i, v in enumerate(best) if v == 1]
+# 5. Estatísticas das áreas selecionadas (totais pelo mesmo produto matricial do GA)
+selected_idx = np.flatnonzero(best)
+totals = population_totals(best[None, :], build_attribute_matrix(prod, cost, water, fert, price, risk))
 print(f"\nTotal de áreas selecionadas: {len(selected_idx)}")
-if selected_idx:
-    print(f"IDs das áreas selecionadas: {selected_idx}")
-    print(f"Produtividade total: {sum(prod[selected_idx]):.2f} toneladas")
-    print(f"Custo total: {sum(cost[selected_idx]):.2f}")
-    print(f"Consumo total de água: {sum(water[selected_idx]):.2f} m³")
-    print(f"Consumo total de fertilizante: {sum(fert[selected_idx]):.2f} kg")
-    print(f"Receita total: {sum(prod[selected_idx] * price[selected_idx]):.2f}")
-    print(f"Risco total: {sum(risk[selected_idx]):.2f} (índice 0-10)")
-    print(f"Tipos de solo presentes: {', '.join(set(soil_type[selected_idx]))}")
-    print(f"Culturas presentes: {', '.join(set(crop_type[selected_idx]))}")
-
-# 6. Penalidades aplicadas
-def calc_penalty(cost, water, fert, budget, water_limit, fert_limit):
-    penalty = 0.0
-    if cost > budget:
-        penalty += (cost - budget) * 2.0
-    if water > water_limit:
-        penalty += (water - water_limit) * 1.5
-    if fert > fert_limit:
-        penalty += (fert - fert_limit) * 1.2
-    return penalty
-
-penalty = calc_penalty(
-    sum(cost[selected_idx]),
-    sum(water[selected_idx]),
-    sum(fert[selected_idx]),
-    budget, water_limit, fert_limit
-)
+if len(selected_idx):
+    print(f"IDs das áreas selecionadas: {selected_idx.tolist()}")
+    print(f"Produtividade total: {prod[selected_idx].sum():.2f} toneladas")
+    print(f"Custo total: {totals[0, COST]:.2f}")
+    print(f"Consumo total de água: {totals[0, WATER]:.2f} m³")
+    print(f"Consumo total de fertilizante: {totals[0, FERT]:.2f} kg")
+    print(f"Receita total: {totals[0, REVENUE]:.2f}")
+    print(f"Risco total: {totals[0, RISK]:.2f} (índice 0-10)")
+    print(f"Tipos de solo presentes: {', '.join(sorted(set(np.asarray(soil_type)[selected_idx])))}")
+    print(f"Culturas presentes: {', '.join(sorted(set(np.asarray(crop_type)[selected_idx])))}")
+
+# 6. Penalidades aplicadas (mesma fórmula da fitness: receita - custo - risco - penalidade)
+fit = fitness_from_totals(totals, budget, water_limit, fert_limit)[0]
+penalty = totals[0, REVENUE] - totals[0, COST] - totals[0, RISK] - fit
 print(f"Penalidade total aplicada por exceder limites: {penalty:.2f}")
 
 # 7. Distribuição dos atributos das áreas selecionadas
@@ -89,13 +82,13 @@ if len(selected_idx) > 0:
 
 # 9. Recursos totais utilizados vs limites
 print(f"\nRecursos totais utilizados vs limites:")
-print(f"Custo: {sum(cost[selected_idx]):.2f} / Limite: {budget}")
-print(f"Água: {sum(water[selected_idx]):.2f} / Limite: {water_limit} m³")
-print(f"Fertilizante: {sum(fert[selected_idx]):.2f} / Limite: {fert_limit} kg")
+print(f"Custo: {totals[0, COST]:.2f} / Limite: {budget}")
+print(f"Água: {totals[0, WATER]:.2f} / Limite: {water_limit} m³")
+print(f"Fertilizante: {totals[0, FERT]:.2f} / Limite: {fert_limit} kg")
 
 os.makedirs('figures', exist_ok=True)
 
-# 10. Análise gráfica da convergência (salva e mostra)
+# 10. Análise gráfica da convergência
 plt.figure(figsize=(10,5))
 plt.plot(res['history']['best_fitness'], label='Best Fitness')
 plt.plot(res['history']['mean_fitness'], label='Mean Fitness')
@@ -107,7 +100,7 @@ plt.tight_layout()
 plt.savefig('figures/convergence.png', dpi=140)
 
 # 11. Scatter risco vs produtividade das áreas selecionadas
-if selected_idx:
+if len(selected_idx):
     plt.figure(figsize=(6,5))
     plt.scatter(df['risk'], df['prod'], alpha=0.35, label='Todas as áreas')
     plt.scatter(selected_df['risk'], selected_df['prod'], color='red', alpha=0.8, label='Selecionadas')
@@ -125,5 +118,5 @@ plt.title('Distribuição do Best Fitness (todas as gerações)')
 plt.xlabel('Fitness')
 plt.tight_layout()
 plt.savefig('figures/best_fitness_box.png', dpi=140)
-
-plt.show()
\ No newline at end of file
+plt.close('all')
+print("\nFiguras salvas em figures/ (para um diretório inteiro de resultados, use python -m src.analysis)")
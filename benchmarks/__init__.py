@@ -0,0 +1 @@
+"""Benchmarks de desempenho do GA (throughput, escalabilidade e memória)."""
@@ -0,0 +1,213 @@
+"""Benchmark de throughput e escalabilidade do GA.
+
+Gera datasets com `generate_and_save` em vários tamanhos e varre número de
+áreas, tamanho da população e combinações de operadores, medindo gerações/s,
+avaliações/s, pico de memória (tracemalloc) e tempo até a fitness alvo.
+
+Uso:
+    python -m benchmarks.bench_ga --out benchmarks/baseline.json
+    python -m benchmarks.bench_ga --compare benchmarks/baseline.json --threshold 0.1
+"""
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+from src.data_generator import generate_and_save
+from src.utils import load_data
+from src.ga_core import run_ga, build_attribute_matrix, lp_upper_bound
+
+
+# Métricas em que valores maiores são melhores; nas demais, menores são melhores
+HIGHER_IS_BETTER = ('gens_per_sec', 'evals_per_sec', 'best_fitness')
+LOWER_IS_BETTER = ('peak_mem_mb', 'time_to_target', 'gens_to_target')
+
+
+def _dataset(data_dir: Path, n_items: int, seed: int):
+    path = data_dir / f"bench_N{n_items}_seed{seed}.csv"
+    if not path.exists():
+        generate_and_save(path=str(path), N=n_items, seed=seed)
+    return load_data(str(path))
+
+
+def _limits(cost, water, fert, tightness: float):
+    # limites proporcionais ao total do dataset, para que o problema escale com N
+    return float(cost.sum() * tightness), float(water.sum() * tightness), float(fert.sum() * tightness)
+
+
+def bench_case(
+    data,
+    pop_size: int,
+    n_gens: int,
+    selection: str,
+    crossover: str,
+    mutation: str,
+    repeats: int = 3,
+    tightness: float = 0.3,
+    target_frac: float = 0.8,
+    seed: int = 0,
+    target: Optional[float] = None,
+    **ga_kwargs
+) -> Dict[str, Any]:
+    """Mede um caso: melhor tempo entre `repeats` execuções e pico de memória em uma execução extra.
+
+    A fitness alvo é absoluta: `target` (ex.: o do baseline) ou `target_frac`
+    do limite superior de `lp_upper_bound`, que só depende do dataset e dos
+    limites. Sem alvo atingido, `gens_to_target` e `time_to_target` saem None.
+    """
+    prod, cost, water, fert, price, risk = data[:6]
+    budget, water_limit, fert_limit = _limits(cost, water, fert, tightness)
+    if target is None:
+        attrs = build_attribute_matrix(prod, cost, water, fert, price, risk)
+        target = target_frac * lp_upper_bound(attrs, budget, water_limit, fert_limit)
+    kwargs = dict(
+        budget=budget, water_limit=water_limit, fert_limit=fert_limit,
+        pop_size=pop_size, n_gens=n_gens, selection_method=selection,
+        crossover_method=crossover, mutation_method=mutation, elitism=1,
+        early_stop=False, **ga_kwargs
+    )
+    runs = []
+    for r in range(repeats):
+        # instante de término de cada geração, via callback do run_ga
+        gen_times = []
+        t0 = time.perf_counter()
+        _, res = run_ga(
+            prod, cost, water, fert, price, risk, rng=np.random.default_rng(seed + r),
+            callback=lambda snap: gen_times.append(snap['elapsed']), **kwargs
+        )
+        runs.append((time.perf_counter() - t0, res, gen_times))
+    elapsed, res, gen_times = min(runs, key=lambda x: x[0])
+    gens = res['counters']['generations']
+    best_hist = np.maximum.accumulate(res['history']['best_fitness'])
+    reached = best_hist >= target
+    gen_to_target = int(np.argmax(reached)) + 1 if reached.any() else None
+
+    tracemalloc.start()
+    run_ga(prod, cost, water, fert, price, risk, rng=np.random.default_rng(seed), **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'n_items': len(prod),
+        'pop_size': pop_size,
+        'n_gens': gens,
+        'operators': f"{selection}/{crossover}/{mutation}",
+        'time_seconds': elapsed,
+        'gens_per_sec': gens / elapsed,
+        'evals_per_sec': res['counters']['evaluations'] / elapsed,
+        'peak_mem_mb': peak / 2**20,
+        'target': float(target),
+        'gens_to_target': gen_to_target,
+        'time_to_target': gen_times[gen_to_target - 1] if gen_to_target else None,
+        'best_fitness': float(res['best_fitness']),
+        'phase_seconds': res['timings'],
+    }
+
+
+def case_key(case: Dict[str, Any]) -> str:
+    return f"N={case['n_items']},pop={case['pop_size']},{case['operators']}"
+
+
+def run_suite(args, targets: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Roda todos os casos; `targets` (por `case_key`) fixa o alvo de cada caso, como no baseline."""
+    data_dir = Path(args.data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    combos = [c.split(':') for c in args.combos.split(',')]
+    ga_kwargs = {'packed': args.packed, 'delta_eval': args.delta_eval}
+    cases = []
+    for n_items in (int(n) for n in args.sizes.split(',')):
+        data = _dataset(data_dir, n_items, args.seed)
+        for pop_size in (int(p) for p in args.pop_sizes.split(',')):
+            for selection, crossover, mutation in combos:
+                key = case_key({'n_items': n_items, 'pop_size': pop_size, 'operators': f"{selection}/{crossover}/{mutation}"})
+                case = bench_case(
+                    data, pop_size, args.gens, selection, crossover, mutation,
+                    repeats=args.repeats, tightness=args.tightness,
+                    target_frac=args.target_frac, seed=args.seed,
+                    target=(targets or {}).get(key), **ga_kwargs
+                )
+                cases.append(case)
+                to_target = 'alvo não atingido' if case['time_to_target'] is None else f"alvo em {case['time_to_target']:.3f} s"
+                print(f"{case_key(case):60s} {case['gens_per_sec']:9.1f} ger/s "
+                      f"{case['evals_per_sec']:11.0f} aval/s {case['peak_mem_mb']:8.1f} MB {to_target}")
+    return {
+        'meta': {
+            'timestamp': int(time.time()),
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'args': vars(args),
+        },
+        'results': {case_key(c): c for c in cases},
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Lista as regressões maiores que `threshold` (fração) entre casos presentes nos dois arquivos."""
+    regressions = []
+    for key, cur in current['results'].items():
+        base = baseline['results'].get(key)
+        if base is None:
+            continue
+        for metric in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+            b, c = base.get(metric), cur.get(metric)
+            if b is not None and c is None and metric in ('gens_to_target', 'time_to_target'):
+                regressions.append(f"{key}: alvo {base.get('target', float('nan')):.4g} não atingido (baseline: {metric} {b:.4g})")
+                continue
+            if not b or c is None:
+                continue
+            # denominador em módulo: a fitness pode ser negativa
+            change = (c - b) / abs(b)
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > threshold:
+                regressions.append(f"{key}: {metric} {b:.4g} -> {c:.4g} ({worse:+.1%} pior)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de throughput e escalabilidade do GA')
+    parser.add_argument('--sizes', type=str, default='100,1000,10000', help='Números de áreas (N)')
+    parser.add_argument('--pop-sizes', type=str, default='50,200')
+    parser.add_argument('--combos', type=str, default='tournament:two_point:bit_flip,roulette:uniform:swap,rank:one_point:bit_flip',
+                        help='Combinações seleção:crossover:mutação separadas por vírgula')
+    parser.add_argument('--gens', type=int, default=50)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--tightness', type=float, default=0.3, help='Limites como fração do total de cada recurso')
+    parser.add_argument('--target-frac', type=float, default=0.8, help='Alvo como fração do limite superior (LP)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--packed', action='store_true')
+    parser.add_argument('--delta-eval', action='store_true')
+    parser.add_argument('--data-dir', type=str, default='data/bench')
+    parser.add_argument('--out', type=str, default=None, help='Salva os resultados em JSON (ex.: baseline)')
+    parser.add_argument('--compare', type=str, default=None, help='Compara com um JSON salvo anteriormente')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Regressão tolerada (fração)')
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    # na comparação, cada caso mira o mesmo alvo absoluto do baseline
+    targets = None
+    if baseline is not None:
+        targets = {k: c['target'] for k, c in baseline['results'].items() if c.get('target') is not None}
+    report = run_suite(args, targets)
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(report, indent=2))
+        print(f"Resultados salvos em {out}")
+    if baseline is not None:
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressão(ões) acima de {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nSem regressões acima de {args.threshold:.0%} em relação a {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
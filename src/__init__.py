@@ -1,5 +1,5 @@
 """Pacote src para permitir imports relativos e execução como módulo."""
 
 __all__ = [
-    'data_generator', 'utils', 'ga_core', 'experiments'
+    'data_generator', 'utils', 'ga_core', 'experiments', 'islands', 'tuning', 'nsga2', 'sweep', 'service', 'analysis'
 ]
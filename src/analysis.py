@@ -0,0 +1,335 @@
+"""Análise em lote de um diretório de resultados de `experiments.py`.
+
+Carrega todos os resultados (JSONs individuais e `batch_results.jsonl`, ou o
+`batch_results.csv` quando é a única fonte) em colunas numpy, avalia os
+`best_vector` de cada dataset de uma vez (um produto matricial com a matriz de
+atributos) e gera rankings e figuras. As figuras são renderizadas sem janela
+(backend Agg) em processos paralelos; matplotlib só é importado nos workers.
+
+Uso:
+    python -m src.analysis --results results --out results/analysis --workers 4
+"""
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
+import argparse
+import ast
+import csv
+import json
+import re
+import time
+import numpy as np
+
+try:
+    from .utils import load_data
+    from .ga_core import build_attribute_matrix, population_totals, fitness_from_totals, REVENUE, COST, WATER, FERT, RISK
+except Exception:
+    from utils import load_data
+    from ga_core import build_attribute_matrix, population_totals, fitness_from_totals, REVENUE, COST, WATER, FERT, RISK
+
+
+# Limites padrão de run_single_experiment, para configs que os omitem
+DEFAULT_LIMITS = {'budget': 1200, 'water_limit': 1200, 'fert_limit': 600}
+DEFAULT_DATA_PATH = 'data/farm_data_seed42.csv'
+# Colunas numéricas calculadas por `analyze_results`
+METRIC_FIELDS = (
+    'revenue', 'cost', 'water', 'fert', 'risk', 'n_selected', 'excess_cost', 'excess_water',
+    'excess_fert', 'penalty', 'fitness', 'feasible', 'rank'
+)
+# Colunas dos CSVs de saída
+SOLUTION_FIELDS = (
+    'source', 'experiment', 'timestamp', 'data_path', 'seed', 'selection_method', 'crossover_method',
+    'mutation_method', 'budget', 'water_limit', 'fert_limit', 'best_fitness', 'time_seconds'
+) + METRIC_FIELDS
+METHOD_FIELDS = ('selection_method', 'crossover_method', 'mutation_method', 'runs', 'best_fitness', 'mean_fitness',
+                 'std_fitness', 'feasible_share', 'mean_time_seconds')
+
+_RESULT_NAME = re.compile(r'result_seed.*_exp(\d+)_(\d+)\.json$')
+
+
+def _records_from_dir(results_dir: Path) -> List[Tuple[str, Dict[str, Any]]]:
+    # JSONL e JSONs individuais trazem os mesmos resultados: (experimento, timestamp) identifica cada um
+    records, seen = [], set()
+    sink = results_dir / 'batch_results.jsonl'
+    if sink.exists():
+        with open(sink, encoding='utf-8') as fh:
+            for line in fh:
+                if line.strip():
+                    rec = json.loads(line)
+                    # experimentos que falharam não têm solução
+                    if rec.get('error'):
+                        continue
+                    seen.add((rec.get('experiment'), rec.get('timestamp')))
+                    records.append((sink.name, rec))
+    for path in sorted(results_dir.glob('result_*.json')):
+        m = _RESULT_NAME.search(path.name)
+        key = (int(m.group(1)), int(m.group(2))) if m else None
+        if key in seen:
+            continue
+        rec = json.loads(path.read_text(encoding='utf-8'))
+        if m:
+            rec.setdefault('experiment', key[0])
+            rec.setdefault('timestamp', key[1])
+        records.append((path.name, rec))
+    csv_path = results_dir / 'batch_results.csv'
+    if not records and csv_path.exists():
+        # no CSV, config e best_vector estão como repr de dict/lista
+        with open(csv_path, newline='', encoding='utf-8') as fh:
+            for i, row in enumerate(csv.DictReader(fh)):
+                if row.get('error'):
+                    continue
+                rec = dict(row, config=ast.literal_eval(row['config']), best_vector=ast.literal_eval(row['best_vector']))
+                rec['experiment'] = i + 1
+                records.append((csv_path.name, rec))
+    return records
+
+
+def load_results(results_dir: str = 'results') -> Dict[str, np.ndarray]:
+    """Lê todos os resultados de `results_dir` em colunas (um array por campo, uma posição por resultado).
+
+    `vectors` é uma lista de arrays int8 (os `best_vector`, cujo tamanho varia
+    entre datasets); os limites vêm do config de cada resultado, com os padrões
+    de `run_single_experiment`.
+    """
+    records = _records_from_dir(Path(results_dir))
+    cfgs = [rec.get('config') or {} for _, rec in records]
+
+    def column(values, dtype):
+        return np.array(list(values), dtype=dtype)
+
+    table = {
+        'source': column((src for src, _ in records), object),
+        'experiment': column((rec.get('experiment', -1) for _, rec in records), np.int64),
+        'timestamp': column((rec.get('timestamp', -1) for _, rec in records), np.int64),
+        'data_path': column((cfg.get('data_path', DEFAULT_DATA_PATH) for cfg in cfgs), object),
+        'seed': column((cfg.get('seed', -1) if cfg.get('seed') is not None else -1 for cfg in cfgs), np.int64),
+        'selection_method': column((rec.get('selection_method', '') for _, rec in records), object),
+        # resultados adaptativos antigos trazem o crossover/mutação (ignorados) do config
+        'crossover_method': column(('adaptive' if cfg.get('adaptive_operators') else rec.get('crossover_method', '')
+                                    for cfg, (_, rec) in zip(cfgs, records)), object),
+        'mutation_method': column(('adaptive' if cfg.get('adaptive_operators') else rec.get('mutation_method', '')
+                                   for cfg, (_, rec) in zip(cfgs, records)), object),
+        'best_fitness': column((rec.get('best_fitness', np.nan) for _, rec in records), np.float64),
+        'time_seconds': column((rec.get('time_seconds', np.nan) for _, rec in records), np.float64),
+    }
+    for key, default in DEFAULT_LIMITS.items():
+        table[key] = column((cfg.get(key, default) for cfg in cfgs), np.float64)
+    table['vectors'] = [np.asarray(rec.get('best_vector', []), dtype=np.int8) for _, rec in records]
+    return table
+
+
+def analyze_results(table: Dict[str, np.ndarray], datasets: Optional[Dict[str, tuple]] = None) -> Dict[str, np.ndarray]:
+    """Acrescenta a `table` o uso de recursos, penalidades e o ranking de cada solução.
+
+    Os vetores de cada dataset são empilhados e avaliados com um único produto
+    matricial (`population_totals`); as penalidades saem de `fitness_from_totals`
+    com os limites de cada linha. Resultados cujo dataset não existe (ou cujo
+    vetor não tem o tamanho do dataset) ficam com NaN. `rank` ordena pela
+    fitness recalculada (0 = melhor) entre todos os resultados.
+    """
+    n = len(table['best_fitness'])
+    totals = np.full((n, 5), np.nan)
+    n_selected = np.array([int(v.sum()) for v in table['vectors']], dtype=np.int64)
+    datasets = {} if datasets is None else datasets
+    for data_path in np.unique(table['data_path']) if n else []:
+        if data_path not in datasets:
+            if not Path(data_path).exists():
+                print(f"Dataset não encontrado, resultados sem métricas: {data_path}")
+                continue
+            datasets[data_path] = load_data(data_path)
+        attrs = build_attribute_matrix(*datasets[data_path][:6])
+        rows = np.flatnonzero((table['data_path'] == data_path)
+                              & np.array([len(v) == len(attrs) for v in table['vectors']], dtype=bool))
+        if len(rows):
+            totals[rows] = population_totals(np.stack([table['vectors'][i] for i in rows]), attrs)
+
+    limits = np.column_stack([table['budget'], table['water_limit'], table['fert_limit']])
+    excess = np.maximum(totals[:, [COST, WATER, FERT]] - limits, 0.0)
+    fitness = fitness_from_totals(totals, table['budget'], table['water_limit'], table['fert_limit'])
+    out = dict(table)
+    out.update({
+        'revenue': totals[:, REVENUE],
+        'cost': totals[:, COST],
+        'water': totals[:, WATER],
+        'fert': totals[:, FERT],
+        'risk': totals[:, RISK],
+        'n_selected': n_selected,
+        'excess_cost': excess[:, 0],
+        'excess_water': excess[:, 1],
+        'excess_fert': excess[:, 2],
+        # fitness = receita - custo - risco - penalidade
+        'penalty': totals[:, REVENUE] - totals[:, COST] - totals[:, RISK] - fitness,
+        'fitness': fitness,
+        'feasible': ~np.isnan(fitness) & (excess.sum(axis=1) == 0),
+    })
+    rank = np.empty(n, dtype=np.int64)
+    # NaN por último
+    rank[np.argsort(np.where(np.isnan(fitness), np.inf, -fitness), kind='stable')] = np.arange(n)
+    out['rank'] = rank
+    return out
+
+
+def method_ranking(table: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Resumo por combinação (seleção, crossover, mutação), do maior para o menor fitness médio."""
+    if not len(table['best_fitness']):
+        return []
+    keys = np.array([f'{s}|{c}|{m}' for s, c, m in zip(
+        table['selection_method'], table['crossover_method'], table['mutation_method'])])
+    combos, inv = np.unique(keys, return_inverse=True)
+    fit = table['fitness'] if 'fitness' in table else table['best_fitness']
+    fit = np.where(np.isnan(fit), table['best_fitness'], fit)
+    count = np.bincount(inv)
+    mean = np.bincount(inv, weights=fit) / count
+    var = np.bincount(inv, weights=np.square(fit - mean[inv])) / count
+    best = np.full(len(combos), -np.inf)
+    np.maximum.at(best, inv, fit)
+    feasible = np.bincount(inv, weights=table['feasible'].astype(np.float64)) / count if 'feasible' in table else np.full(len(combos), np.nan)
+    mean_time = np.bincount(inv, weights=np.nan_to_num(table['time_seconds'])) / count
+    ranking = []
+    for i in np.argsort(-mean, kind='stable'):
+        sel, cross, mut = combos[i].split('|')
+        ranking.append({
+            'selection_method': sel,
+            'crossover_method': cross,
+            'mutation_method': mut,
+            'runs': int(count[i]),
+            'best_fitness': float(best[i]),
+            'mean_fitness': float(mean[i]),
+            'std_fitness': float(np.sqrt(var[i])),
+            'feasible_share': float(feasible[i]),
+            'mean_time_seconds': float(mean_time[i]),
+        })
+    return ranking
+
+
+def _render_figure(task: Dict[str, Any]) -> str:
+    """Desenha uma figura (executado nos workers); matplotlib é importado aqui, sem janela."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    kind = task['kind']
+    fig, ax = plt.subplots(figsize=task.get('figsize', (8, 5)))
+    if kind == 'fitness_hist':
+        ax.hist(task['fitness'], bins=min(50, max(5, len(task['fitness']) // 5)))
+        ax.set_xlabel('Fitness')
+        ax.set_ylabel('Execuções')
+        ax.set_title('Distribuição do melhor fitness')
+    elif kind == 'methods_box':
+        ax.boxplot(task['groups'], vert=False)
+        ax.set_yticks(range(1, len(task['labels']) + 1))
+        ax.set_yticklabels(task['labels'], fontsize=7)
+        ax.set_xlabel('Fitness')
+        ax.set_title('Fitness por combinação de métodos')
+    elif kind == 'resource_usage':
+        for name, usage in task['usage'].items():
+            ax.hist(usage, bins=30, alpha=0.5, label=name)
+        ax.axvline(1.0, color='black', linestyle='--', linewidth=1)
+        ax.set_xlabel('Uso / limite')
+        ax.set_ylabel('Execuções')
+        ax.set_title('Uso de recursos em relação aos limites')
+        ax.legend()
+    elif kind == 'time_vs_fitness':
+        ax.scatter(task['time_seconds'], task['fitness'], s=10, alpha=0.6, c=task['feasible'], cmap='coolwarm_r')
+        ax.set_xlabel('Tempo (s)')
+        ax.set_ylabel('Fitness')
+        ax.set_title('Tempo vs fitness (cor: viável)')
+    else:
+        plt.close(fig)
+        raise ValueError(f"Figura desconhecida: {kind}")
+    fig.tight_layout()
+    fig.savefig(task['path'], dpi=task.get('dpi', 140))
+    plt.close(fig)
+    return task['path']
+
+
+def figure_tasks(table: Dict[str, np.ndarray], out_dir: str) -> List[Dict[str, Any]]:
+    """Tarefas de figura, cada uma só com os arrays de que precisa (enviadas aos workers)."""
+    out = Path(out_dir)
+    ok = ~np.isnan(table['fitness'])
+    fit = table['fitness'][ok]
+    ranking = method_ranking(table)
+    keys = np.array([f'{s}|{c}|{m}' for s, c, m in zip(
+        table['selection_method'][ok], table['crossover_method'][ok], table['mutation_method'][ok])])
+    groups = [fit[keys == f"{r['selection_method']}|{r['crossover_method']}|{r['mutation_method']}"] for r in ranking]
+    labels = [f"{r['selection_method']}/{r['crossover_method']}/{r['mutation_method']}" for r in ranking]
+    keep = [i for i, g in enumerate(groups) if len(g)]
+    return [
+        {'kind': 'fitness_hist', 'path': str(out / 'fitness_hist.png'), 'fitness': fit},
+        {'kind': 'methods_box', 'path': str(out / 'methods_box.png'), 'figsize': (9, 6),
+         'groups': [groups[i] for i in keep], 'labels': [labels[i] for i in keep]},
+        {'kind': 'resource_usage', 'path': str(out / 'resource_usage.png'), 'usage': {
+            'custo': table['cost'][ok] / table['budget'][ok],
+            'água': table['water'][ok] / table['water_limit'][ok],
+            'fertilizante': table['fert'][ok] / table['fert_limit'][ok],
+        }},
+        {'kind': 'time_vs_fitness', 'path': str(out / 'time_vs_fitness.png'),
+         'time_seconds': table['time_seconds'][ok], 'fitness': fit, 'feasible': table['feasible'][ok].astype(np.float64)},
+    ]
+
+
+def render_figures(table: Dict[str, np.ndarray], out_dir: str, workers: int = 1) -> List[str]:
+    """Renderiza as figuras de `figure_tasks` em `workers` processos; retorna os caminhos."""
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    tasks = figure_tasks(table, out_dir)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_render_figure, tasks))
+    return [_render_figure(task) for task in tasks]
+
+
+def _write_csv(path: Path, fields, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as fh:
+        writer = csv.DictWriter(fh, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def summarize_results(
+    results_dir: str = 'results',
+    out_dir: str = 'results/analysis',
+    workers: int = 1,
+    figures: bool = True
+) -> Dict[str, Any]:
+    """Carrega, analisa e grava `solutions.csv` (ordenado pelo rank), `methods.csv` e as figuras."""
+    start_time = time.perf_counter()
+    table = analyze_results(load_results(results_dir))
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    order = np.argsort(table['rank'], kind='stable')
+    columns = {k: table[k] for k in SOLUTION_FIELDS}
+    _write_csv(out / 'solutions.csv', SOLUTION_FIELDS,
+               ({k: (v[i].item() if isinstance(v[i], np.generic) else v[i]) for k, v in columns.items()} for i in order))
+    ranking = method_ranking(table)
+    _write_csv(out / 'methods.csv', METHOD_FIELDS, ranking)
+    paths = render_figures(table, out_dir, workers) if figures and len(order) else []
+    return {
+        'n_results': len(order),
+        'table': table,
+        'methods': ranking,
+        'figures': paths,
+        'time_seconds': time.perf_counter() - start_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--results', type=str, default='results', help='Diretório com os resultados de experiments.py')
+    parser.add_argument('--out', type=str, default='results/analysis')
+    parser.add_argument('--workers', type=int, default=1, help='Processos para renderizar as figuras')
+    parser.add_argument('--no-figures', action='store_true')
+    args = parser.parse_args()
+    try:
+        summary = summarize_results(args.results, args.out, workers=args.workers, figures=not args.no_figures)
+    except ImportError as exc:
+        # matplotlib ausente: refaz só as tabelas
+        print(f"Figuras não geradas ({exc}); rode com matplotlib instalado ou use --no-figures")
+        summary = summarize_results(args.results, args.out, workers=args.workers, figures=False)
+    print(f"{summary['n_results']} resultados analisados em {summary['time_seconds']:.2f} s; tabelas em {args.out}")
+    for row in summary['methods'][:5]:
+        print(f"  {row['selection_method']}/{row['crossover_method']}/{row['mutation_method']}: "
+              f"média {row['mean_fitness']:.2f}, melhor {row['best_fitness']:.2f} ({row['runs']} execuções)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,20 @@
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, Any, Optional
+import argparse
+import os
 import numpy as np
 import pandas as pd
 
+try:
+    from .utils import COLUMNAR_SUFFIX, FLOAT_COLUMNS, create_columnar, finalize_columnar, read_columnar
+except Exception:
+    from utils import COLUMNAR_SUFFIX, FLOAT_COLUMNS, create_columnar, finalize_columnar, read_columnar
+
+
+SOIL_TYPES = ['argiloso', 'arenoso', 'siltoso']
+CROP_TYPES = ['soja', 'milho', 'algodao', 'trigo']
+
 def generate_and_save(path: str = 'data/farm_data_seed42.csv', N: int = 100, seed: int = 42):
     """Gera N áreas com produtividade e custo e salva em CSV.
 
@@ -14,8 +27,8 @@ def generate_and_save(path: str = 'data/farm_data_seed42.csv', N: int = 100, see
     fert = rng.uniform(2, 15, size=N)    # consumo de fertilizante (kg)
     price = rng.uniform(0.8, 2.0, size=N) # preço de venda por unidade
     risk = rng.uniform(0, 10, size=N)    # índice de risco (0=baixo, 10=alto)
-    soil_types = rng.choice(['argiloso', 'arenoso', 'siltoso'], size=N)
-    crop_types = rng.choice(['soja', 'milho', 'algodao', 'trigo'], size=N)
+    soil_types = rng.choice(SOIL_TYPES, size=N)
+    crop_types = rng.choice(CROP_TYPES, size=N)
     df = pd.DataFrame({
         'area_id': range(N),
         'prod': prod,
@@ -33,6 +46,147 @@ def generate_and_save(path: str = 'data/farm_data_seed42.csv', N: int = 100, see
     df.to_csv(p, index=False)
     print(f"Saved {N} samples to {p.resolve()}")
 
+
+def generate_scenarios(
+    prod: np.ndarray,
+    price: np.ndarray,
+    n_scenarios: int = 1000,
+    seed: Optional[int] = None,
+    prod_cv=0.15,
+    price_cv=0.10,
+    path: Optional[str] = None
+) -> np.ndarray:
+    """Sorteia cenários de clima e preço; retorna a matriz `(n_scenarios, N)` de receitas.
+
+    Produtividade e preço recebem fatores lognormais de média 1, com coeficiente
+    de variação `prod_cv` e `price_cv` (escalares ou um valor por área). O preço
+    tem um choque comum a todas as áreas no cenário mais um idiossincrático.
+    Com `path`, a matriz também é salva em .npy.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(prod)
+
+    def factors(cv, z):
+        sigma = np.sqrt(np.log1p(np.square(np.broadcast_to(np.asarray(cv, dtype=np.float64), (n,)))))
+        return np.exp(sigma * z - 0.5 * sigma ** 2)
+
+    prod_f = factors(prod_cv, rng.standard_normal((n_scenarios, n)))
+    # metade da variância do preço vem do mercado (comum a todas as áreas)
+    z_price = np.sqrt(0.5) * rng.standard_normal((n_scenarios, 1)) + np.sqrt(0.5) * rng.standard_normal((n_scenarios, n))
+    price_f = factors(price_cv, z_price)
+    scenarios = (np.asarray(prod) * prod_f) * (np.asarray(price) * price_f)
+    if path is not None:
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        np.save(p, scenarios)
+    return scenarios
+
+
+def _generate_chunk(seed_seq: np.random.SeedSequence, n: int) -> Dict[str, np.ndarray]:
+    # mesmas distribuições de generate_and_save; categorias como códigos em SOIL_TYPES/CROP_TYPES
+    rng = np.random.default_rng(seed_seq)
+    return {
+        'prod': rng.uniform(10, 100, size=n),
+        'cost': rng.uniform(1, 50, size=n),
+        'water': rng.uniform(5, 30, size=n),
+        'fert': rng.uniform(2, 15, size=n),
+        'price': rng.uniform(0.8, 2.0, size=n),
+        'risk': rng.uniform(0, 10, size=n),
+        'soil_type': rng.integers(0, len(SOIL_TYPES), size=n).astype(np.int8),
+        'crop_type': rng.integers(0, len(CROP_TYPES), size=n).astype(np.int8),
+    }
+
+
+def _chunk_task(task: Dict[str, Any]) -> Optional[bytes]:
+    """Gera um bloco; no formato colunar grava direto no arquivo, em CSV devolve o texto."""
+    start, n = task['start'], task['n']
+    cols = _generate_chunk(task['seed_seq'], n)
+    if task['columnar'] is not None:
+        _, out = read_columnar(task['columnar'], mode='r+')
+        for name, values in cols.items():
+            out[name][start:start + n] = values
+            out[name].flush()
+        return None
+    df = pd.DataFrame({'area_id': np.arange(start, start + n)})
+    for name in FLOAT_COLUMNS:
+        df[name] = cols[name]
+    df['soil_type'] = np.asarray(SOIL_TYPES)[cols['soil_type']]
+    df['crop_type'] = np.asarray(CROP_TYPES)[cols['crop_type']]
+    df['seed'] = task['seed']
+    return df.to_csv(index=False, header=start == 0).encode('utf-8')
+
+
+def generate_chunked(
+    path: str,
+    N: int,
+    seed: int = 42,
+    chunk_size: int = 1 << 20,
+    workers: int = 1
+) -> Path:
+    """Gera N áreas em blocos de `chunk_size`, em `workers` processos.
+
+    O RNG de cada bloco vem de `SeedSequence(seed).spawn`, então o arquivo é
+    idêntico byte a byte para a mesma semente e `chunk_size`, com qualquer número
+    de workers. Caminhos terminados em COLUMNAR_SUFFIX saem no formato colunar
+    de `utils` (cada worker grava seu bloco direto no arquivo); os demais, em CSV
+    com as mesmas colunas de `generate_and_save`. O arquivo só aparece em `path`
+    depois de completo.
+    """
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    columnar = p.suffix == COLUMNAR_SUFFIX
+    chunk_size = max(1, chunk_size)
+    starts = range(0, N, chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    tmp = str(p) + '.tmp'
+    if columnar:
+        source = {'generator': {'N': N, 'seed': seed, 'chunk_size': chunk_size}}
+        create_columnar(str(p), N, {'soil_type': SOIL_TYPES, 'crop_type': CROP_TYPES}, seed=seed, source=source)
+    tasks = [{
+        'start': start,
+        'n': min(chunk_size, N - start),
+        'seed_seq': seeds[i],
+        'seed': seed,
+        'columnar': tmp if columnar else None,
+    } for i, start in enumerate(starts)]
+
+    with open(os.devnull if columnar else tmp, 'wb') as fh:
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # map devolve os blocos na ordem: o CSV é escrito sequencialmente
+                for text in executor.map(_chunk_task, tasks):
+                    if text is not None:
+                        fh.write(text)
+        else:
+            for task in tasks:
+                text = _chunk_task(task)
+                if text is not None:
+                    fh.write(text)
+        if not columnar and N == 0:
+            fh.write(','.join(['area_id', *FLOAT_COLUMNS, 'soil_type', 'crop_type', 'seed']).encode('utf-8') + b'\n')
+    if columnar:
+        finalize_columnar(str(p))
+    else:
+        os.replace(tmp, p)
+    print(f"Saved {N} samples to {p.resolve()}")
+    return p
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--out', type=str, default='data/farm_data_seed42.csv', help='CSV, ou .bin para o formato colunar')
+    parser.add_argument('--N', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunked', action='store_true', help='Gera em blocos (necessário para .bin e datasets grandes)')
+    parser.add_argument('--chunk-size', type=int, default=1 << 20)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+    if args.chunked or Path(args.out).suffix == COLUMNAR_SUFFIX:
+        generate_chunked(args.out, args.N, seed=args.seed, chunk_size=args.chunk_size, workers=args.workers)
+    else:
+        generate_and_save(path=args.out, N=args.N, seed=args.seed)
+
+
 if __name__ == '__main__':
     # default run when executed as script
-    generate_and_save()
+    main()
@@ -1,86 +1,286 @@
-import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import Optional
 import argparse
+import contextlib
+import csv
+import json
+import os
 import time
 import numpy as np
 
 # Support running as module (python -m src.experiments) or as script (python src\experiments.py)
 try:
-    from .data_generator import generate_and_save
+    from .data_generator import generate_and_save, generate_scenarios
     from .utils import load_data
-    from .ga_core import run_ga
+    from .ga_core import run_ga, FitnessCache
 except Exception:
-    from data_generator import generate_and_save
+    from data_generator import generate_and_save, generate_scenarios
     from utils import load_data
-    from ga_core import run_ga
+    from ga_core import run_ga, FitnessCache
+
+
+
+# Colunas do CSV de batch (mesma ordem do antigo DataFrame de resultados)
+CSV_FIELDS = [
+    'config', 'best_fitness', 'time_seconds', 'selection_method',
+    'crossover_method', 'mutation_method', 'best_vector', 'cache', 'error'
+]
+
+# Chaves do config de experimento com nome diferente em `run_ga`
+CONFIG_ALIASES = {
+    'selection': 'selection_method', 'crossover': 'crossover_method',
+    'mutation': 'mutation_method', 'repair': 'repair_violations'
+}
+
+# Datasets carregados por processo worker: data_path -> arrays de load_data
+_DATASETS = {}
+
+
+def _init_worker(data_paths):
+    # cada worker abre o cache colunar via memmap: as páginas são compartilhadas entre processos
+    global _DATASETS
+    _DATASETS = {path: load_data(path) for path in data_paths}
 
 
+def load_datasets(cfgs) -> dict:
+    """Carrega (gerando se preciso) cada `data_path` distinto uma única vez."""
+    datasets = {}
+    for cfg in cfgs:
+        data_path = cfg.get('data_path', 'data/farm_data_seed42.csv')
+        if data_path in datasets:
+            continue
+        if not Path(data_path).exists():
+            generate_and_save(path=data_path, N=cfg.get('N', 100), seed=cfg.get('seed', 42))
+        datasets[data_path] = load_data(data_path)
+    return datasets
+
+
+def ga_kwargs_from_config(cfg: dict, data) -> dict:
+    """Argumentos de `run_ga` descritos por um config de experimento.
+
+    Mesmos padrões de `run_single_experiment`; ficam de fora `rng`, `verbose` e
+    `callback`. `data` (saída de `load_data`) é usado para gerar os cenários.
+    """
+    prod, price = data[0], data[4]
+    # 'scenarios': {'n': 1000, 'prod_cv': 0.15, 'price_cv': 0.1, 'seed': 0} ou caminho de um .npy
+    scenarios = None
+    scen_cfg = cfg.get('scenarios')
+    if isinstance(scen_cfg, str):
+        scenarios = np.load(scen_cfg)
+    elif scen_cfg:
+        scenarios = generate_scenarios(
+            prod, price,
+            n_scenarios=scen_cfg.get('n', 1000),
+            seed=scen_cfg.get('seed', cfg.get('seed')),
+            prod_cv=scen_cfg.get('prod_cv', 0.15),
+            price_cv=scen_cfg.get('price_cv', 0.10)
+        )
+    cache = None
+    if cfg.get('cache_size') or cfg.get('cache_bytes'):
+        cache = FitnessCache(cfg.get('cache_size'), cfg.get('cache_bytes'))
+    return dict(
+        budget=cfg.get('budget', 1200),
+        water_limit=cfg.get('water_limit', 1200),
+        fert_limit=cfg.get('fert_limit', 600),
+        pop_size=cfg.get('pop_size', 100),
+        n_gens=cfg.get('n_gens', 100),
+        mutation_rate=cfg.get('mutation_rate', 0.01),
+        selection_method=cfg.get('selection', 'tournament'),
+        tournament_k=cfg.get('tournament_k', 3),
+        crossover_method=cfg.get('crossover', 'two_point'),
+        mutation_method=cfg.get('mutation', 'bit_flip'),
+        elitism=cfg.get('elitism', 1),
+        early_stop=cfg.get('early_stop', True),
+        repair_violations=cfg.get('repair', False),
+        repair_add_back=cfg.get('repair_add_back', False),
+        seeding=cfg.get('seeding', 0.0),
+        optimality_gap=cfg.get('optimality_gap'),
+        checkpoint_path=cfg.get('checkpoint_path'),
+        checkpoint_every=cfg.get('checkpoint_every', 100),
+        checkpoint_seconds=cfg.get('checkpoint_seconds'),
+        resume_from=cfg.get('resume_from'),
+        scenarios=scenarios,
+        scenario_objective=cfg.get('scenario_objective', 'mean'),
+        cvar_alpha=cfg.get('cvar_alpha', 0.1),
+        dedup=cfg.get('dedup', False),
+        diversity_control=cfg.get('diversity_control', False),
+        diversity_target=cfg.get('diversity_target', 0.05),
+        adaptive_operators=cfg.get('adaptive_operators', False),
+        packed=cfg.get('packed', False),
+        delta_eval=cfg.get('delta_eval', False),
+        cache=cache
+    )
+
 
-def run_experiment_from_config(config_path: str, save_csv: bool = True):
+def run_single_experiment(cfg: dict, data, verbose: bool = True, callback=None) -> dict:
+    rng = np.random.default_rng(cfg.get('seed', None))
+    best, res = run_ga(
+        *data[:6],
+        rng=rng,
+        verbose=verbose,
+        callback=callback,
+        **ga_kwargs_from_config(cfg, data)
+    )
+    out = {
+        'config': cfg,
+        'best_fitness': float(res['best_fitness']),
+        'time_seconds': float(res['time_seconds']),
+        'selection_method': cfg.get('selection', 'tournament'),
+        # com adaptive_operators, run_ga ignora crossover e mutação do config
+        'crossover_method': 'adaptive' if cfg.get('adaptive_operators') else cfg.get('crossover', 'two_point'),
+        'mutation_method': 'adaptive' if cfg.get('adaptive_operators') else cfg.get('mutation', 'bit_flip'),
+        'best_vector': best.tolist()
+    }
+    if 'cache' in res:
+        out['cache'] = res['cache']
+    if 'scenario_profit' in res:
+        out['scenario_profit'] = res['scenario_profit']
+    if 'operator_quality' in res:
+        out['operator_quality'] = dict(zip(res['operators'], res['operator_quality']))
+    if 'upper_bound' in res:
+        out['upper_bound'] = res['upper_bound']
+        out['gap'] = res['gap']
+    return out
+
+
+def _experiment_task(args):
+    idx, cfg = args
+    data = _DATASETS[cfg.get('data_path', 'data/farm_data_seed42.csv')]
+    return idx, run_single_experiment(cfg, data, verbose=False)
+
+
+def _append_line(fh, line: str):
+    # cada resultado vai para o disco assim que termina
+    fh.write(line)
+    fh.flush()
+    os.fsync(fh.fileno())
+
+
+def _open_csv_sink(path: Path):
+    # CSV append-only como o JSONL; um CSV de outro formato é renomeado, não misturado
+    if path.exists() and path.stat().st_size > 0:
+        with open(path, newline='', encoding='utf-8') as fh:
+            header = next(csv.reader(fh), [])
+        if header != CSV_FIELDS:
+            old = path.with_name(f"{path.stem}_{int(time.time())}{path.suffix}")
+            os.replace(path, old)
+            print(f"CSV com colunas antigas movido para {old}")
+    return open(path, 'a', newline='', encoding='utf-8')
+
+
+def run_experiment_from_config(
+    config_path: str,
+    save_csv: bool = True,
+    workers: int = 1,
+    sink_path: Optional[str] = None
+):
+    """Roda a lista de configs (serial ou em `workers` processos).
+
+    Cada resultado é gravado ao terminar: um JSON por experimento em `results/`,
+    uma linha no JSONL append-only `sink_path` (padrão results/batch_results.jsonl)
+    e, com `save_csv`, uma linha em results/batch_results.csv (também append-only).
+    Um experimento que falha (dataset ilegível, config inválido, worker que
+    caiu) vira um registro com `error` no JSONL e no CSV, e o lote continua.
+    """
     p = Path(config_path)
     cfgs = json.loads(p.read_text())
     # Permite lista de configs ou único config
     if isinstance(cfgs, dict):
         cfgs = [cfgs]
-    results = []
+    results = [None] * len(cfgs)
     results_dir = Path('results')
     results_dir.mkdir(parents=True, exist_ok=True)
-    for idx, cfg in enumerate(cfgs):
-        print(f"\n--- Rodando experimento {idx+1}/{len(cfgs)} ---")
+    # cada dataset é carregado à parte: um caminho ilegível derruba só os experimentos que o usam
+    datasets, load_errors = {}, {}
+    for cfg in cfgs:
         data_path = cfg.get('data_path', 'data/farm_data_seed42.csv')
-        if not Path(data_path).exists():
-            generate_and_save(path=data_path, N=cfg.get('N', 100), seed=cfg.get('seed', 42))
-        prod, cost, water, fert, price, risk, soil_type, crop_type, seed = load_data(data_path)
-        budget = cfg.get('budget', 1200)
-        water_limit = cfg.get('water_limit', 1200)
-        fert_limit = cfg.get('fert_limit', 600)
-        rng = np.random.default_rng(cfg.get('seed', None))
-        best, res = run_ga(
-            prod, cost, water, fert, price, risk,
-            budget=budget,
-            water_limit=water_limit,
-            fert_limit=fert_limit,
-            pop_size=cfg.get('pop_size', 100),
-            n_gens=cfg.get('n_gens', 100),
-            mutation_rate=cfg.get('mutation_rate', 0.01),
-            selection_method=cfg.get('selection', 'tournament'),
-            tournament_k=cfg.get('tournament_k', 3),
-            crossover_method=cfg.get('crossover', 'two_point'),
-            mutation_method=cfg.get('mutation', 'bit_flip'),
-            elitism=cfg.get('elitism', 1),
-            rng=rng,
-            verbose=True
-        )
-        out = {
-            'config': cfg,
-            'best_fitness': float(res['best_fitness']),
-            'time_seconds': float(res['time_seconds']),
-            'selection_method': cfg.get('selection', 'tournament'),
-            'crossover_method': cfg.get('crossover', 'two_point'),
-            'mutation_method': cfg.get('mutation', 'bit_flip'),
-            'best_vector': best.tolist()
-        }
-        results.append(out)
-    timestamp = int(time.time())
-    out_path = results_dir / f"result_seed{cfg.get('seed', 'na')}_exp{idx+1}_{timestamp}.json"
-    out_path.write_text(json.dumps(out, indent=2))
-    print(f"Wrote result to {out_path}")
-    # Exportar CSV
+        if data_path in datasets or data_path in load_errors:
+            continue
+        try:
+            datasets.update(load_datasets([cfg]))
+        except Exception as exc:
+            load_errors[data_path] = exc
+    sink = Path(sink_path) if sink_path else results_dir / 'batch_results.jsonl'
+    sink.parent.mkdir(parents=True, exist_ok=True)
+    csv_path = results_dir / 'batch_results.csv'
+    with contextlib.ExitStack() as stack:
+        jsonl_fh = stack.enter_context(open(sink, 'a', encoding='utf-8'))
+        csv_writer = None
+        if save_csv:
+            csv_fh = stack.enter_context(_open_csv_sink(csv_path))
+            csv_writer = csv.DictWriter(csv_fh, fieldnames=CSV_FIELDS, extrasaction='ignore')
+            if csv_fh.tell() == 0:
+                csv_writer.writeheader()
+                csv_fh.flush()
+
+        def record(idx: int, out: dict):
+            results[idx] = out
+            timestamp = int(time.time())
+            out_path = results_dir / f"result_seed{out['config'].get('seed', 'na')}_exp{idx+1}_{timestamp}.json"
+            out_path.write_text(json.dumps(out, indent=2))
+            _append_line(jsonl_fh, json.dumps(dict(out, experiment=idx + 1, timestamp=timestamp)) + '\n')
+            if csv_writer is not None:
+                csv_writer.writerow(out)
+                csv_fh.flush()
+            print(f"Wrote result to {out_path}")
+
+        def record_error(idx: int, exc: BaseException):
+            out = {'config': cfgs[idx], 'error': f"{type(exc).__name__}: {exc}"}
+            results[idx] = out
+            failed.append(idx)
+            _append_line(jsonl_fh, json.dumps(dict(out, experiment=idx + 1, timestamp=int(time.time()))) + '\n')
+            if csv_writer is not None:
+                csv_writer.writerow(out)
+                csv_fh.flush()
+            print(f"--- Experimento {idx+1} falhou: {out['error']} ---")
+
+        failed = []
+        pending = []
+        for idx, cfg in enumerate(cfgs):
+            exc = load_errors.get(cfg.get('data_path', 'data/farm_data_seed42.csv'))
+            if exc is not None:
+                record_error(idx, exc)
+            else:
+                pending.append((idx, cfg))
+        if workers > 1 and pending:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(list(datasets),)) as executor:
+                futures = {executor.submit(_experiment_task, (idx, cfg)): idx for idx, cfg in pending}
+                for n_done, future in enumerate(as_completed(futures), start=1):
+                    try:
+                        idx, out = future.result()
+                    except Exception as exc:
+                        # inclui BrokenProcessPool: os demais experimentos seguem sendo registrados
+                        record_error(futures[future], exc)
+                        continue
+                    print(f"--- Experimento {idx+1} concluído ({n_done}/{len(cfgs)}): best fitness {out['best_fitness']:.2f} ---")
+                    record(idx, out)
+        else:
+            for idx, cfg in pending:
+                print(f"\n--- Rodando experimento {idx+1}/{len(cfgs)} ---")
+                try:
+                    data = datasets[cfg.get('data_path', 'data/farm_data_seed42.csv')]
+                    out = run_single_experiment(cfg, data)
+                except Exception as exc:
+                    record_error(idx, exc)
+                    continue
+                record(idx, out)
+    if failed:
+        print(f"{len(failed)} de {len(cfgs)} experimentos falharam: {[idx + 1 for idx in sorted(failed)]}")
+    print(f"Streamed results to {sink}")
     if save_csv:
-        import pandas as pd
-        df = pd.DataFrame(results)
-        csv_path = results_dir / "batch_results.csv"
-        df.to_csv(csv_path, index=False)
         print(f"Batch results saved to {csv_path}")
-
+    return results
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--config', type=str, default='configs/baseline.json')
     parser.add_argument('--no-csv', action='store_true', help='Não exportar CSV dos resultados')
+    parser.add_argument('--workers', type=int, default=1, help='Processos para rodar os experimentos em paralelo')
+    parser.add_argument('--sink', type=str, default=None, help='Arquivo JSONL (append) com cada resultado ao terminar')
     args = parser.parse_args()
-    run_experiment_from_config(args.config, save_csv=not args.no_csv)
+    run_experiment_from_config(args.config, save_csv=not args.no_csv, workers=args.workers, sink_path=args.sink)
 
 
 if __name__ == '__main__':
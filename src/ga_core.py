@@ -1,4 +1,9 @@
-from typing import Tuple, Dict, Any, Optional
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple, Dict, Any, Optional, Union, Callable
+import hashlib
+import json
+import os
 import numpy as np
 import time
 
@@ -7,6 +12,273 @@ def init_population(pop_size: int, chromosome_length: int, rng: np.random.Genera
     return rng.integers(0, 2, size=(pop_size, chromosome_length), dtype=np.int8)
 
 
+# Modo empacotado: 8 genes por byte (np.packbits, bit mais significativo primeiro),
+# bits de preenchimento do último byte sempre zerados.
+_BYTE_PREFIX = np.array([(0xFF << (8 - r)) & 0xFF for r in range(8)], dtype=np.uint8)
+
+
+def packed_prefix_masks(cuts: np.ndarray, n_bytes: int) -> np.ndarray:
+    """Máscaras empacotadas (len(cuts), n_bytes) com os genes [0, cut) ligados."""
+    cuts = np.asarray(cuts, dtype=np.int64)[:, None]
+    words = np.arange(n_bytes)
+    q, r = cuts >> 3, cuts & 7
+    return np.where(words < q, np.uint8(0xFF), np.where(words == q, _BYTE_PREFIX[r], np.uint8(0))).astype(np.uint8)
+
+
+def init_packed_population(pop_size: int, chromosome_length: int, rng: np.random.Generator):
+    n_bytes = (chromosome_length + 7) // 8
+    pop = rng.integers(0, 256, size=(pop_size, n_bytes), dtype=np.uint8)
+    pop &= packed_prefix_masks([chromosome_length], n_bytes)
+    return pop
+
+
+def pack_population(pop: np.ndarray) -> np.ndarray:
+    return np.packbits(np.asarray(pop, dtype=np.uint8), axis=-1)
+
+
+def unpack_population(packed: np.ndarray, chromosome_length: int) -> np.ndarray:
+    return np.unpackbits(packed, axis=-1, count=chromosome_length).astype(np.int8)
+
+
+
+# Colunas da matriz de atributos / totais por indivíduo
+ATTR_COLUMNS = ('revenue', 'cost', 'water', 'fert', 'risk')
+REVENUE, COST, WATER, FERT, RISK = range(len(ATTR_COLUMNS))
+# Pesos das penalidades por unidade excedida (orçamento, água, fertilizante)
+PENALTY_WEIGHTS = (2.0, 1.5, 1.2)
+
+# Limite de elementos (linhas x genes) convertidos para float por bloco na avaliação
+_EVAL_BLOCK_ELEMS = 1 << 22
+
+
+def build_attribute_matrix(
+    prod: np.ndarray,
+    cost: np.ndarray,
+    water: np.ndarray,
+    fert: np.ndarray,
+    price: np.ndarray,
+    risk: np.ndarray
+) -> np.ndarray:
+    """Monta a matriz (n_items, 5) com receita, custo, água, fertilizante e risco por área.
+
+    Calculada uma vez por dataset; a ordem das colunas segue ATTR_COLUMNS.
+    """
+    return np.ascontiguousarray(np.column_stack([
+        np.asarray(prod, dtype=np.float64) * np.asarray(price, dtype=np.float64),
+        np.asarray(cost, dtype=np.float64),
+        np.asarray(water, dtype=np.float64),
+        np.asarray(fert, dtype=np.float64),
+        np.asarray(risk, dtype=np.float64),
+    ]))
+
+
+def population_totals(pop: np.ndarray, attrs: np.ndarray) -> np.ndarray:
+    """Totais (pop_size, 5) de cada indivíduo via produto matricial com `attrs`.
+
+    A população é processada em blocos de linhas para limitar a cópia em float.
+    """
+    pop = np.atleast_2d(pop)
+    n_rows, n_items = pop.shape
+    totals = np.empty((n_rows, attrs.shape[1]), dtype=np.float64)
+    step = max(1, _EVAL_BLOCK_ELEMS // max(1, n_items))
+    for start in range(0, n_rows, step):
+        stop = min(n_rows, start + step)
+        np.matmul(pop[start:stop].astype(np.float64), attrs, out=totals[start:stop])
+    return totals
+
+
+def packed_population_totals(packed: np.ndarray, attrs: np.ndarray) -> np.ndarray:
+    """Como `population_totals`, para população empacotada.
+
+    Desempacota apenas blocos de colunas (e de linhas) por vez, nunca a população inteira.
+    """
+    packed = np.atleast_2d(packed)
+    n_rows, n_bytes = packed.shape
+    n_items = len(attrs)
+    totals = np.zeros((n_rows, attrs.shape[1]), dtype=np.float64)
+    block_bytes = max(1, min(n_bytes, _EVAL_BLOCK_ELEMS // (8 * max(1, n_rows))))
+    row_step = max(1, _EVAL_BLOCK_ELEMS // (8 * block_bytes))
+    for b0 in range(0, n_bytes, block_bytes):
+        b1 = min(n_bytes, b0 + block_bytes)
+        g0, g1 = 8 * b0, min(n_items, 8 * b1)
+        for r0 in range(0, n_rows, row_step):
+            r1 = min(n_rows, r0 + row_step)
+            bits = np.unpackbits(packed[r0:r1, b0:b1], axis=1, count=g1 - g0)
+            totals[r0:r1] += bits.astype(np.float64) @ attrs[g0:g1]
+    return totals
+
+
+def fitness_from_totals(
+    totals: np.ndarray,
+    budget: float,
+    water_limit: float,
+    fert_limit: float
+) -> np.ndarray:
+    """Fitness de cada linha de `totals`: receita líquida menos risco e penalidades."""
+    w_cost, w_water, w_fert = PENALTY_WEIGHTS
+    penalty = (
+        np.maximum(totals[:, COST] - budget, 0.0) * w_cost
+        + np.maximum(totals[:, WATER] - water_limit, 0.0) * w_water
+        + np.maximum(totals[:, FERT] - fert_limit, 0.0) * w_fert
+    )
+    return totals[:, REVENUE] - totals[:, COST] - totals[:, RISK] - penalty
+
+
+def batch_fitness(
+    pop: np.ndarray,
+    attrs: np.ndarray,
+    budget: float,
+    water_limit: float,
+    fert_limit: float,
+    packed: bool = False
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Avalia a população inteira de uma vez.
+
+    Retorna `(fitnesses, totals)`, onde `totals[:, c]` traz o total da coluna
+    ATTR_COLUMNS[c] (receita, custo, água, fertilizante, risco) de cada indivíduo.
+    Com `packed=True`, `pop` está no formato de `init_packed_population`.
+    """
+    totals = packed_population_totals(pop, attrs) if packed else population_totals(pop, attrs)
+    return fitness_from_totals(totals, budget, water_limit, fert_limit), totals
+
+
+SCENARIO_OBJECTIVES = ('mean', 'cvar', 'worst')
+
+
+def scenario_revenue(
+    pop: np.ndarray,
+    scenarios: np.ndarray,
+    objective: str = 'mean',
+    alpha: float = 0.1,
+    packed: bool = False
+) -> np.ndarray:
+    """Receita robusta de cada indivíduo sobre a matriz de cenários `(S, n_items)`.
+
+    `scenarios[s, i]` é a receita (prod * price) da área i no cenário s. A grade
+    população x cenários sai de um produto matricial por bloco de linhas e é
+    reduzida pela média ('mean'), pela média dos `alpha` piores cenários ('cvar')
+    ou pelo pior cenário ('worst').
+    """
+    if objective not in SCENARIO_OBJECTIVES:
+        raise ValueError(f"Objetivo de cenários desconhecido: {objective}")
+    n_rows = len(pop)
+    n_scen, n_items = scenarios.shape
+    out = np.empty(n_rows, dtype=np.float64)
+    if n_rows == 0:
+        return out
+    scen_t = np.ascontiguousarray(scenarios.T, dtype=np.float64)
+    k = min(n_scen, max(1, int(np.ceil(alpha * n_scen))))
+    step = max(1, _EVAL_BLOCK_ELEMS // max(1, n_items, n_scen))
+    for start in range(0, n_rows, step):
+        stop = min(n_rows, start + step)
+        block = unpack_population(pop[start:stop], n_items) if packed else pop[start:stop]
+        rev = block.astype(np.float64) @ scen_t
+        if objective == 'mean':
+            out[start:stop] = rev.mean(axis=1)
+        elif objective == 'worst':
+            out[start:stop] = rev.min(axis=1)
+        else:
+            out[start:stop] = np.partition(rev, k - 1, axis=1)[:, :k].mean(axis=1)
+    return out
+
+
+def unique_rows(pop: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Índice da primeira ocorrência de cada linha distinta de `pop` e o inverso (linha -> distinta)."""
+    pop = np.ascontiguousarray(pop)
+    rows = pop.view(np.dtype((np.void, pop.dtype.itemsize * pop.shape[1]))).ravel()
+    _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    return first, inverse.ravel()
+
+
+class FitnessCache:
+    """Cache LRU dos totais (receita, custo, água, fertilizante, risco) por cromossomo.
+
+    A chave é um hash blake2b de 128 bits do cromossomo empacotado. Como os totais
+    não dependem dos limites, o mesmo cache pode ser compartilhado entre execuções
+    sobre o mesmo dataset. O orçamento é dado em
+    entradas e/ou em bytes (estimativa por entrada, incluindo chave e objetos).
+    """
+
+    ENTRY_BYTES = 256
+
+    def __init__(self, max_entries: Optional[int] = 100_000, max_bytes: Optional[int] = None):
+        limits = [n for n in (max_entries, None if max_bytes is None else max_bytes // self.ENTRY_BYTES) if n is not None]
+        if not limits:
+            raise ValueError("FitnessCache requer max_entries ou max_bytes")
+        self.max_entries = max(1, min(limits))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[bytes, np.ndarray]' = OrderedDict()
+        self._dataset: Optional[bytes] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def bind(self, attrs: np.ndarray):
+        """Associa o cache a um dataset; usar outro dataset depois é um erro."""
+        key = hashlib.blake2b(np.ascontiguousarray(attrs).tobytes(), digest_size=16).digest()
+        if self._dataset is None:
+            self._dataset = key
+        elif self._dataset != key:
+            raise ValueError("FitnessCache já está associado a outro dataset")
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self._entries)}
+
+    def population_totals(
+        self,
+        pop: np.ndarray,
+        attrs: np.ndarray,
+        packed: bool = False,
+        revenue: Optional[Tuple[bytes, Callable[[np.ndarray], np.ndarray]]] = None
+    ) -> np.ndarray:
+        """Totais de cada linha de `pop`, avaliando em lote apenas os cromossomos ausentes.
+
+        Com `revenue = (tag, fn)`, a coluna de receita das linhas ausentes vem de
+        `fn(linhas)` (ex.: receita robusta sobre cenários) e `tag` entra na chave,
+        separando as entradas de cada variante da receita.
+        """
+        keys_src = pop if packed else pack_population(pop)
+        if revenue is None:
+            keys = [hashlib.blake2b(row.tobytes(), digest_size=16).digest() for row in keys_src]
+        else:
+            base = hashlib.blake2b(revenue[0], digest_size=16)
+            keys = []
+            for row in keys_src:
+                h = base.copy()
+                h.update(row.tobytes())
+                keys.append(h.digest())
+        totals = np.empty((len(pop), attrs.shape[1]), dtype=np.float64)
+        entries = self._entries
+        missing: Dict[bytes, list] = {}
+        for i, key in enumerate(keys):
+            row = entries.get(key)
+            if row is not None:
+                entries.move_to_end(key)
+                totals[i] = row
+                self.hits += 1
+            elif key in missing:
+                # clone dentro do mesmo lote: avaliado uma única vez
+                missing[key].append(i)
+                self.hits += 1
+            else:
+                missing[key] = [i]
+                self.misses += 1
+        if missing:
+            first = np.array([rows[0] for rows in missing.values()])
+            new = packed_population_totals(pop[first], attrs) if packed else population_totals(pop[first], attrs)
+            if revenue is not None:
+                new[:, REVENUE] = revenue[1](pop[first])
+            for (key, rows), row_totals in zip(missing.items(), new):
+                totals[rows] = row_totals
+                entries[key] = row_totals
+            overflow = len(entries) - self.max_entries
+            for _ in range(max(0, overflow)):
+                entries.popitem(last=False)
+            self.evictions += max(0, overflow)
+        return totals
+
 
 def fitness(
     chromosome: np.ndarray,
@@ -27,13 +299,14 @@ def fitness(
     total_fert = float(np.sum(chromosome * fert))
     total_risk = float(np.sum(chromosome * risk))
     # Penalização por violar restrições
+    w_cost, w_water, w_fert = PENALTY_WEIGHTS
     penalty = 0.0
     if total_cost > budget:
-        penalty += (total_cost - budget) * 2.0
+        penalty += (total_cost - budget) * w_cost
     if total_water > water_limit:
-        penalty += (total_water - water_limit) * 1.5
+        penalty += (total_water - water_limit) * w_water
     if total_fert > fert_limit:
-        penalty += (total_fert - fert_limit) * 1.2
+        penalty += (total_fert - fert_limit) * w_fert
     # Fitness: receita líquida menos risco e penalidades
     return total_revenue - total_cost - total_risk - penalty
 
@@ -45,27 +318,93 @@ def tournament_selection(pop: np.ndarray, fitnesses: np.ndarray, rng: np.random.
     return pop[winner].copy()
 
 
-def roulette_selection(pop: np.ndarray, fitnesses: np.ndarray, rng: np.random.Generator):
+def _roulette_weights(fitnesses: np.ndarray) -> np.ndarray:
     # ensure non-negative
     minf = fitnesses.min()
     if minf < 0:
-        fitnesses = fitnesses - minf
-    s = fitnesses.sum()
+        return fitnesses - minf
+    return fitnesses
+
+
+def _rank_weights(fitnesses: np.ndarray) -> np.ndarray:
+    # higher fitness -> lower rank index -> peso n - rank (um único argsort)
+    n = len(fitnesses)
+    weights = np.empty(n, dtype=np.float64)
+    weights[np.argsort(-fitnesses, kind='stable')] = np.arange(n, 0, -1)
+    return weights
+
+
+def roulette_selection(pop: np.ndarray, fitnesses: np.ndarray, rng: np.random.Generator):
+    weights = _roulette_weights(fitnesses)
+    s = weights.sum()
     if s == 0:
         # fallback to random
         return pop[rng.integers(0, len(pop))].copy()
-    probs = fitnesses / s
-    idx = rng.choice(len(pop), p=probs)
+    idx = rng.choice(len(pop), p=weights / s)
     return pop[idx].copy()
 
 
 def rank_selection(pop: np.ndarray, fitnesses: np.ndarray, rng: np.random.Generator):
-    ranks = np.argsort(np.argsort(-fitnesses))  # higher fitness -> lower rank index
-    probs = (len(fitnesses) - ranks) / np.sum(len(fitnesses) - ranks)
-    idx = rng.choice(len(pop), p=probs)
+    weights = _rank_weights(fitnesses)
+    idx = rng.choice(len(pop), p=weights / weights.sum())
     return pop[idx].copy()
 
 
+SELECTION_METHODS = ('tournament', 'roulette', 'rank', 'sus')
+
+
+def build_selection_table(fitnesses: np.ndarray, method: str = 'tournament', k: int = 3) -> Dict[str, Any]:
+    """Monta a estrutura de amostragem de uma geração.
+
+    roulette/sus guardam a tabela cumulativa dos pesos deslocados, rank guarda a
+    cumulativa dos pesos por posição (ranks calculados uma vez) e tournament
+    guarda as fitnesses para torneios k-way vetorizados. Métodos desconhecidos
+    levantam ValueError, como crossover e mutação (ver `validate_operators`).
+    """
+    validate_operators(selection_method=method)
+    fitnesses = np.asarray(fitnesses, dtype=np.float64)
+    table: Dict[str, Any] = {'method': method, 'n': len(fitnesses)}
+    if method in ('roulette', 'sus', 'rank'):
+        weights = _rank_weights(fitnesses) if method == 'rank' else _roulette_weights(fitnesses)
+        cdf = np.cumsum(weights)
+        # pesos todos nulos: fallback para sorteio uniforme
+        table['cdf'] = cdf if cdf[-1] > 0 else np.arange(1, len(fitnesses) + 1, dtype=np.float64)
+    else:
+        table['fitnesses'] = fitnesses
+        table['k'] = max(1, int(k))
+    return table
+
+
+def sample_parents(table: Dict[str, Any], n: int, rng: np.random.Generator) -> np.ndarray:
+    """Sorteia `n` índices de pais a partir de uma tabela de `build_selection_table`."""
+    pop_size = table['n']
+    if table['method'] == 'tournament':
+        idx = rng.integers(0, pop_size, size=(n, table['k']))
+        return idx[np.arange(n), np.argmax(table['fitnesses'][idx], axis=1)]
+    cdf = table['cdf']
+    total = cdf[-1]
+    if table['method'] == 'sus':
+        # stochastic universal sampling: n ponteiros igualmente espaçados, embaralhados
+        # para que os pares de pais não saiam ordenados
+        pointers = (rng.random() + np.arange(n)) * (total / n)
+        idx = np.searchsorted(cdf, pointers, side='right')
+        idx = rng.permutation(np.minimum(idx, pop_size - 1))
+        return idx
+    idx = np.searchsorted(cdf, rng.random(n) * total, side='right')
+    return np.minimum(idx, pop_size - 1)
+
+
+def select_parent_indices(
+    fitnesses: np.ndarray,
+    n: int,
+    rng: np.random.Generator,
+    method: str = 'tournament',
+    k: int = 3
+) -> np.ndarray:
+    """Sorteia todos os `n` índices de pais da geração em uma chamada."""
+    return sample_parents(build_selection_table(fitnesses, method, k), n, rng)
+
+
 def one_point_crossover(a: np.ndarray, b: np.ndarray, rng: np.random.Generator):
     L = len(a)
     if L < 2:
@@ -110,6 +449,449 @@ def swap_mutation(chromosome: np.ndarray, rng: np.random.Generator):
     chromosome[i], chromosome[j] = chromosome[j], chromosome[i]
 
 
+# Fases cronometradas em run_ga (result['timings'])
+PROFILE_PHASES = ('selection', 'crossover', 'mutation', 'repair', 'diversity', 'evaluation', 'elitism', 'restart')
+
+# Operadores suportados pelo motor de variação em lote
+CROSSOVER_METHODS = ('one_point', 'two_point', 'uniform')
+MUTATION_METHODS = ('bit_flip', 'swap')
+
+
+def validate_operators(
+    selection_method: Optional[str] = None,
+    crossover_method: Optional[str] = None,
+    mutation_method: Optional[str] = None
+):
+    """Levanta ValueError para nomes de operador desconhecidos (None não é verificado)."""
+    for kind, name, options in (
+        ('seleção', selection_method, SELECTION_METHODS),
+        ('crossover', crossover_method, CROSSOVER_METHODS),
+        ('mutação', mutation_method, MUTATION_METHODS),
+    ):
+        if name is not None and name not in options:
+            raise ValueError(f"Método de {kind} desconhecido: {name} (opções: {', '.join(options)})")
+
+# Acima desta taxa a mutação bit flip sorteia uma máscara densa em vez de posições esparsas
+_SPARSE_FLIP_MAX_RATE = 0.1
+
+
+def _draw_cut_points(n_pairs: int, length: int, method: str, rng: np.random.Generator):
+    # mesmos sorteios de one_point_crossover / two_point_crossover
+    if method == 'two_point' and length >= 3:
+        p1 = rng.integers(1, length - 1, size=n_pairs)
+        return p1, rng.integers(p1 + 1, length)
+    if length < 2:
+        return np.full(n_pairs, length), None
+    return rng.integers(1, length, size=n_pairs), None
+
+
+def crossover_masks(n_pairs: int, length: int, method: str, rng: np.random.Generator) -> np.ndarray:
+    """Máscaras booleanas (n_pairs, length): True onde o filho 1 herda do pai B.
+
+    Os pontos de corte são sorteados como vetores e as máscaras montadas por
+    broadcasting, reproduzindo as distribuições de `one_point_crossover`,
+    `two_point_crossover` e `uniform_crossover`.
+    """
+    if method == 'uniform':
+        return rng.integers(0, 2, size=(n_pairs, length), dtype=bool)
+    cols = np.arange(length)
+    p1, p2 = _draw_cut_points(n_pairs, length, method, rng)
+    if p2 is None:
+        return cols >= p1[:, None]
+    return (cols >= p1[:, None]) & (cols < p2[:, None])
+
+
+def packed_crossover_masks(n_pairs: int, length: int, method: str, rng: np.random.Generator) -> np.ndarray:
+    """Versão empacotada de `crossover_masks` (uint8, n_pairs x ceil(length / 8))."""
+    n_bytes = (length + 7) // 8
+    valid = packed_prefix_masks([length], n_bytes)
+    if method == 'uniform':
+        masks = rng.integers(0, 256, size=(n_pairs, n_bytes), dtype=np.uint8)
+        masks &= valid
+        return masks
+    p1, p2 = _draw_cut_points(n_pairs, length, method, rng)
+    if p2 is None:
+        return ~packed_prefix_masks(p1, n_bytes) & valid
+    return packed_prefix_masks(p2, n_bytes) & ~packed_prefix_masks(p1, n_bytes)
+
+
+def sparse_flip_positions(n_genes: int, rate: float, rng: np.random.Generator) -> np.ndarray:
+    """Posições (ordenadas) de genes que sofrem bit flip, cada um com probabilidade `rate`.
+
+    Em taxas baixas usa saltos geométricos entre flips, sem sortear um número por gene.
+    """
+    if rate <= 0 or n_genes == 0:
+        return np.empty(0, dtype=np.int64)
+    if rate >= 1:
+        return np.arange(n_genes, dtype=np.int64)
+    if rate > _SPARSE_FLIP_MAX_RATE:
+        return np.flatnonzero(rng.random(n_genes) < rate)
+    expected = n_genes * rate
+    chunk = int(expected + 4.0 * np.sqrt(expected) + 16)
+    parts = []
+    last = -1
+    while last < n_genes:
+        pos = last + np.cumsum(rng.geometric(rate, size=chunk))
+        parts.append(pos)
+        last = int(pos[-1])
+    pos = np.concatenate(parts)
+    return pos[pos < n_genes]
+
+
+def _bit_values(cols: np.ndarray) -> np.ndarray:
+    return (0x80 >> (cols & 7)).astype(np.uint8)
+
+
+def batch_bit_flip_mutation(
+    children: np.ndarray,
+    rate: float,
+    rng: np.random.Generator,
+    packed_length: Optional[int] = None
+) -> np.ndarray:
+    """Bit flip em todo o bloco de filhos; retorna as posições alteradas (linha * n_genes + gene).
+
+    Com `packed_length`, `children` está empacotado com esse número de genes.
+    """
+    if packed_length is None:
+        flat = children.reshape(-1)
+        pos = sparse_flip_positions(flat.size, rate, rng)
+        flat[pos] ^= 1
+        return pos
+    pos = sparse_flip_positions(len(children) * packed_length, rate, rng)
+    rows, cols = np.divmod(pos, packed_length)
+    np.bitwise_xor.at(children, (rows, cols >> 3), _bit_values(cols))
+    return pos
+
+
+def batch_swap_mutation(
+    children: np.ndarray,
+    rate: float,
+    rng: np.random.Generator,
+    packed_length: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Swap mutation em lote: cada filho troca dois genes distintos com probabilidade `rate`.
+
+    Retorna `(rows, i, j)` das trocas aplicadas.
+    """
+    n = len(children)
+    length = children.shape[1] if packed_length is None else packed_length
+    if length < 2:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    rows = np.flatnonzero(rng.random(n) < rate)
+    i = rng.integers(0, length, size=len(rows))
+    j = rng.integers(0, length - 1, size=len(rows))
+    j += j >= i
+    if packed_length is None:
+        gi = children[rows, i]
+        children[rows, i] = children[rows, j]
+        children[rows, j] = gi
+        return rows, i, j
+    # trocar dois bits = inverter ambos quando diferem
+    bi = (children[rows, i >> 3] & _bit_values(i)) != 0
+    bj = (children[rows, j >> 3] & _bit_values(j)) != 0
+    d = bi != bj
+    np.bitwise_xor.at(children, (rows[d], i[d] >> 3), _bit_values(i[d]))
+    np.bitwise_xor.at(children, (rows[d], j[d] >> 3), _bit_values(j[d]))
+    return rows, i, j
+
+
+def _gene_values(pop: np.ndarray, rows: np.ndarray, cols: np.ndarray, packed_length: Optional[int]) -> np.ndarray:
+    if packed_length is None:
+        return pop[rows, cols].astype(np.int64)
+    return ((pop[rows, cols >> 3] & _bit_values(cols)) != 0).astype(np.int64)
+
+
+# Acima desta fração de genes alterados (crossover + mutação), o filho é reavaliado por completo
+_DELTA_MAX_FRACTION = 0.02
+# Abaixo desta fração de pares no caminho incremental, o bloco inteiro é reavaliado
+_DELTA_MIN_SHARE = 0.5
+
+
+def _flat_nonzero(flat: np.ndarray) -> np.ndarray:
+    # varre palavras de 64 bits e só inspeciona os bytes das palavras não nulas
+    n8 = flat.size - flat.size % 8
+    words = np.flatnonzero(flat[:n8].view(np.uint64))
+    cand = (words[:, None] * 8 + np.arange(8)).reshape(-1)
+    cand = cand[flat[cand] != 0]
+    return np.concatenate([cand, n8 + np.flatnonzero(flat[n8:])])
+
+
+def _set_positions(diff: np.ndarray, packed_length: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+    # (linhas, genes) dos bits ligados em `diff`, sem desempacotar bytes nulos
+    diff = np.ascontiguousarray(diff)
+    rows, cols = np.divmod(_flat_nonzero(diff.reshape(-1).view(np.uint8)), diff.shape[1])
+    if packed_length is None:
+        return rows, cols
+    bits = np.unpackbits(diff[rows, cols][:, None], axis=1)
+    k, b = np.nonzero(bits)
+    return rows[k], cols[k] * 8 + b
+
+
+def apply_gene_deltas(
+    totals: np.ndarray,
+    attrs: np.ndarray,
+    rows: np.ndarray,
+    cols: np.ndarray,
+    new_values: np.ndarray
+):
+    """Atualiza `totals` em lugar para genes (rows, cols) que passaram a valer `new_values`.
+
+    Cada gene alterado soma (1 -> ganhou) ou subtrai (0 -> perdeu) sua linha de `attrs`.
+    """
+    if len(rows) == 0:
+        return
+    sign = 2.0 * new_values - 1.0
+    for c in range(attrs.shape[1]):
+        # uma coluna por vez: o gather contíguo sai bem mais barato que attrs[cols]
+        contrib = np.take(attrs[:, c], cols)
+        contrib *= sign
+        totals[:, c] += np.bincount(rows, weights=contrib, minlength=len(totals))
+
+
+def _tick(timings: Optional[Dict[str, float]], phase: str, since: float) -> float:
+    # acumula em timings[phase] o tempo desde `since` e devolve o instante atual
+    now = time.perf_counter()
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0.0) + now - since
+    return now
+
+
+def generate_offspring(
+    pop: np.ndarray,
+    parent_idx: np.ndarray,
+    rng: np.random.Generator,
+    crossover_method: str = 'one_point',
+    mutation_method: str = 'bit_flip',
+    mutation_rate: float = 0.01,
+    out: Optional[np.ndarray] = None,
+    packed_length: Optional[int] = None,
+    totals: Optional[np.ndarray] = None,
+    attrs: Optional[np.ndarray] = None,
+    out_totals: Optional[np.ndarray] = None,
+    timings: Optional[Dict[str, float]] = None
+) -> np.ndarray:
+    """Gera o bloco inteiro de filhos a partir de uma matriz de índices de pais (n_pairs, 2).
+
+    Os filhos do par i ocupam as linhas 2i e 2i+1 de `out` (pré-alocado com
+    n_children <= 2 * n_pairs linhas; se ímpar, o segundo filho do último par é
+    descartado, como no laço original). Com `packed_length`, `pop` está
+    empacotada e crossover/mutação viram operações bit a bit sobre os bytes.
+
+    Avaliação incremental: com `totals` (totais dos pais), `attrs` e `out_totals`,
+    os totais dos filhos são obtidos dos pais somando/subtraindo apenas os genes
+    trocados no crossover e alterados na mutação. Filhos com mais de
+    `_DELTA_MAX_FRACTION` dos genes alterados no total (ou bit flip acima dessa
+    taxa) são avaliados por completo, uma única vez, após a mutação; com menos de
+    `_DELTA_MIN_SHARE` dos pares no caminho incremental, o bloco todo é.
+
+    `timings`, se fornecido, acumula os segundos gastos em 'crossover',
+    'mutation' e 'evaluation' (atualização incremental).
+    """
+    validate_operators(crossover_method=crossover_method, mutation_method=mutation_method)
+    parent_idx = np.asarray(parent_idx).reshape(-1, 2)
+    n_pairs = len(parent_idx)
+    if out is None:
+        out = np.empty((2 * n_pairs, pop.shape[1]), dtype=pop.dtype)
+    n_children = len(out)
+    if n_children > 2 * n_pairs:
+        raise ValueError("Pares de pais insuficientes para preencher `out`")
+    track = totals is not None
+    if track and (attrs is None or out_totals is None or len(out_totals) != n_children):
+        raise ValueError("Avaliação incremental requer `attrs` e `out_totals` com uma linha por filho")
+    c1 = out[0::2]
+    c2 = out[1::2]
+    n1, n2 = len(c1), len(c2)
+    tic = time.perf_counter()
+
+    # c1 = A ^ ((A ^ B) & m) e c2 = B ^ ((A ^ B) & m), com um único temporário
+    np.take(pop, parent_idx[:n1, 0], axis=0, out=c1)
+    diff = pop[parent_idx[:n1, 1]]
+    diff ^= c1
+    np.bitwise_xor(c1[:n2], diff[:n2], out=c2)
+    if packed_length is None:
+        diff &= crossover_masks(n1, pop.shape[1], crossover_method, rng)
+    else:
+        diff &= packed_crossover_masks(n1, packed_length, crossover_method, rng)
+    c1 ^= diff
+    c2 ^= diff[:n2]
+    tic = _tick(timings, 'crossover', tic)
+
+    if track:
+        # cada filho custa um delta por gene alterado no crossover e na mutação; acima de
+        # _DELTA_MAX_FRACTION dos genes, uma avaliação completa após a mutação sai mais barata
+        # (no modo empacotado o crossover conta bytes alterados, uma estimativa por baixo)
+        n_genes = packed_length or pop.shape[1]
+        limit = _DELTA_MAX_FRACTION * n_genes
+        expected = mutation_rate * n_genes if mutation_method == 'bit_flip' else 2.0 * mutation_rate
+        changed = np.full(n_children, n_genes, dtype=np.int64)
+        x_rows = x_cols = x_values = np.empty(0, dtype=np.int64)
+        if expected <= limit:
+            # count_nonzero linha a linha é bem mais rápido que com axis=1
+            n_diff = np.array([np.count_nonzero(row) for row in diff], dtype=np.int64)
+            # pares que a mutação esperada já levaria acima do limite vão direto para a avaliação completa
+            sparse = np.flatnonzero(n_diff + expected <= limit)
+            if len(sparse) < _DELTA_MIN_SHARE * n_pairs:
+                # poucos filhos incrementais não pagam a contabilidade: tudo vai para a avaliação completa
+                sparse = sparse[:0]
+            changed[2 * sparse] = n_diff[sparse]
+            sparse2 = sparse[sparse < n2]
+            changed[2 * sparse2 + 1] = n_diff[sparse2]
+            # c1 parte de A e c2 de B; nos genes trocados c2 muda no sentido oposto de c1
+            out_totals[2 * sparse] = totals[parent_idx[sparse, 0]]
+            out_totals[2 * sparse2 + 1] = totals[parent_idx[sparse2, 1]]
+            rows, x_cols = _set_positions(diff[sparse], packed_length)
+            rows = sparse[rows]
+            x_values = _gene_values(c1, rows, x_cols, packed_length)
+            keep = rows < n2
+            x_rows = np.concatenate([2 * rows, 2 * rows[keep] + 1])
+            x_cols = np.concatenate([x_cols, x_cols[keep]])
+            x_values = np.concatenate([x_values, 1 - x_values[keep]])
+        tic = _tick(timings, 'evaluation', tic)
+
+    if mutation_method == 'swap':
+        rows, i, j = batch_swap_mutation(out, mutation_rate, rng, packed_length)
+        tic = _tick(timings, 'mutation', tic)
+        if track:
+            vi = _gene_values(out, rows, i, packed_length)
+            vj = _gene_values(out, rows, j, packed_length)
+            d = vi != vj
+            rows = np.concatenate([rows[d], rows[d]])
+            cols = np.concatenate([i[d], j[d]])
+            new_values = np.concatenate([vi[d], vj[d]])
+    else:
+        pos = batch_bit_flip_mutation(out, mutation_rate, rng, packed_length)
+        tic = _tick(timings, 'mutation', tic)
+        if track:
+            # só os flips (ordenados) de filhos ainda no caminho incremental
+            kids = np.flatnonzero(changed <= limit)
+            lo = np.searchsorted(pos, kids * n_genes)
+            hi = np.searchsorted(pos, (kids + 1) * n_genes)
+            pos = np.concatenate([pos[:0]] + [pos[i:j] for i, j in zip(lo, hi)])
+            rows, cols = np.divmod(pos, n_genes)
+            new_values = _gene_values(out, rows, cols, packed_length)
+    if track:
+        changed += np.bincount(rows, minlength=n_children)
+        dense = changed > limit
+        rows = np.concatenate([x_rows, rows])
+        cols = np.concatenate([x_cols, cols])
+        new_values = np.concatenate([x_values, new_values])
+        keep = ~dense[rows]
+        apply_gene_deltas(out_totals, attrs, rows[keep], cols[keep], new_values[keep])
+        full = packed_population_totals if packed_length is not None else population_totals
+        if dense.all():
+            out_totals[:] = full(out, attrs)
+        elif dense.any():
+            dense_rows = np.flatnonzero(dense)
+            out_totals[dense_rows] = full(out[dense_rows], attrs)
+        _tick(timings, 'evaluation', tic)
+    return out
+
+
+# Braços do modo adaptativo: cada um é um par (crossover, mutação)
+OPERATOR_ARMS = tuple((c, m) for c in CROSSOVER_METHODS for m in MUTATION_METHODS)
+# Fração mínima dos pares de cada braço (exploração) e peso do crédito novo na qualidade
+_OPERATOR_MIN_SHARE = 0.05
+_OPERATOR_ADAPTATION = 0.3
+
+
+def operator_quotas(quality: np.ndarray, n_pairs: int, min_share: float = _OPERATOR_MIN_SHARE) -> np.ndarray:
+    """Pares de pais de cada braço na geração, por probability matching sobre `quality`.
+
+    Cada braço recebe ao menos `min_share` dos pares; o restante é dividido na
+    proporção da qualidade, com arredondamento pelos maiores restos.
+    """
+    q = np.maximum(np.asarray(quality, dtype=np.float64), 0.0)
+    k = len(q)
+    min_share = min(min_share, 1.0 / k)
+    share = q / q.sum() if q.sum() > 0 else np.full(k, 1.0 / k)
+    raw = (min_share + (1.0 - k * min_share) * share) * n_pairs
+    quotas = np.floor(raw).astype(np.int64)
+    rest = n_pairs - int(quotas.sum())
+    if rest > 0:
+        quotas[np.argsort(quotas - raw, kind='stable')[:rest]] += 1
+    return quotas
+
+
+def operator_rewards(child_fit: np.ndarray, parent_fit: np.ndarray, arms: np.ndarray, n_arms: int) -> np.ndarray:
+    """Crédito de cada braço: melhora média dos seus filhos sobre o melhor dos pais.
+
+    Só melhoras positivas contam; o crédito sai normalizado pelo maior da
+    geração (0 a 1). Braços sem filhos recebem 0.
+    """
+    gain = np.maximum(child_fit - parent_fit, 0.0)
+    count = np.bincount(arms, minlength=n_arms)
+    mean = np.divide(np.bincount(arms, weights=gain, minlength=n_arms), count, out=np.zeros(n_arms), where=count > 0)
+    top = mean.max()
+    return mean / top if top > 0 else mean
+
+
+# Multiplicadores (ímpares, fixos) do hash de linhas, por número de palavras de 64 bits
+_HASH_MULTIPLIERS: Dict[int, np.ndarray] = {}
+# Rodadas de perturbação para desfazer duplicatas
+_DEDUP_ROUNDS = 3
+
+
+def row_hashes(packed: np.ndarray) -> np.ndarray:
+    """Hash uint64 de cada linha empacotada, vetorizado sobre palavras de 64 bits."""
+    n_rows, n_bytes = packed.shape
+    n_words = max(1, (n_bytes + 7) // 8)
+    mult = _HASH_MULTIPLIERS.get(n_words)
+    if mult is None:
+        mult = np.random.default_rng(n_words).integers(1, 2**63, size=n_words, dtype=np.uint64) | np.uint64(1)
+        _HASH_MULTIPLIERS[n_words] = mult
+    buf = np.zeros((n_rows, n_words * 8), dtype=np.uint8)
+    buf[:, :n_bytes] = packed
+    words = buf.view(np.uint64)
+    words ^= words >> np.uint64(29)
+    # aritmética uint64 com estouro modular
+    return (words * mult).sum(axis=1, dtype=np.uint64)
+
+
+def duplicate_mask(pop: np.ndarray, packed: bool = False) -> np.ndarray:
+    """True nas linhas idênticas a alguma linha anterior de `pop`.
+
+    Candidatas saem de hashes iguais (`row_hashes`); o conteúdo é conferido, então
+    colisões de hash não contam como duplicata.
+    """
+    rows = pop if packed else pack_population(pop)
+    dup = np.zeros(len(rows), dtype=bool)
+    if len(rows) < 2:
+        return dup
+    _, first, inverse = np.unique(row_hashes(rows), return_index=True, return_inverse=True)
+    ref = first[inverse.ravel()]
+    cand = np.flatnonzero(ref != np.arange(len(rows)))
+    dup[cand[(rows[cand] == rows[ref[cand]]).all(axis=1)]] = True
+    return dup
+
+
+def population_diversity(pop: np.ndarray, packed_length: Optional[int] = None) -> float:
+    """Distância de Hamming média normalizada entre dois indivíduos: média de 2p(1 - p).
+
+    p é a frequência de 1 em cada gene; 0 = população de clones, 0.5 = máxima.
+    """
+    if len(pop) == 0:
+        return 0.0
+    if packed_length is None:
+        p = np.count_nonzero(pop, axis=0) / len(pop)
+    else:
+        # contagem por posição de bit de cada byte, sem desempacotar
+        counts = np.stack([np.count_nonzero(pop & (0x80 >> b), axis=0) for b in range(8)], axis=1)
+        p = counts.ravel()[:packed_length] / len(pop)
+    return float(np.mean(2 * p * (1 - p)))
+
+
+def perturb_rows(rows: np.ndarray, n_flips: int, rng: np.random.Generator, packed_length: Optional[int] = None):
+    """Inverte `n_flips` genes sorteados em cada linha de `rows` (em lugar)."""
+    n_genes = rows.shape[1] if packed_length is None else packed_length
+    r = np.repeat(np.arange(len(rows)), n_flips)
+    cols = rng.integers(0, n_genes, size=len(r))
+    if packed_length is None:
+        np.bitwise_xor.at(rows, (r, cols), 1)
+    else:
+        np.bitwise_xor.at(rows, (r, cols >> 3), _bit_values(cols))
+
+
 def repair(chromosome: np.ndarray, weights: np.ndarray, budget: float, rng: np.random.Generator):
     # Remove items until weight <= budget: remove items with lowest value/weight first
     while np.sum(chromosome * weights) > budget:
@@ -122,6 +904,265 @@ def repair(chromosome: np.ndarray, weights: np.ndarray, budget: float, rng: np.r
         chromosome[i] = 0
 
 
+# Colunas de recursos com limite, na ordem (orçamento, água, fertilizante)
+RESOURCE_COLUMNS = (COST, WATER, FERT)
+# Rodadas do add-back vetorizado (cada rodada pula um item que não coube)
+_ADD_BACK_ROUNDS = 8
+
+
+def repair_order(
+    attrs: np.ndarray,
+    budget: float,
+    water_limit: float,
+    fert_limit: float,
+    resource: Optional[int] = None
+) -> np.ndarray:
+    """Ordem dos genes da pior para a melhor densidade de valor por recurso.
+
+    Valor = receita - custo - risco; uso = soma dos recursos normalizados pelos
+    respectivos limites, ou só a coluna `resource` (COST, WATER ou FERT) quando
+    informada. Calculada uma vez por execução.
+    """
+    limits = np.maximum(np.array([budget, water_limit, fert_limit], dtype=np.float64), 1e-12)
+    value = attrs[:, REVENUE] - attrs[:, COST] - attrs[:, RISK]
+    if resource is None:
+        usage = (attrs[:, RESOURCE_COLUMNS] / limits).sum(axis=1)
+    else:
+        usage = attrs[:, resource]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        density = np.where(usage > 0, value / usage, np.inf)
+    return np.argsort(density, kind='stable')
+
+
+def repair_population(
+    pop: np.ndarray,
+    attrs: np.ndarray,
+    budget: float,
+    water_limit: float,
+    fert_limit: float,
+    order: Optional[np.ndarray] = None,
+    add_back: bool = False,
+    packed: bool = False
+) -> np.ndarray:
+    """Repara em lugar os indivíduos que violam orçamento, água ou fertilizante.
+
+    Para cada indivíduo inviável remove, na ordem de `repair_order` (pior densidade
+    primeiro), o menor prefixo de genes selecionados cujas somas cumulativas cobrem
+    o excesso dos três recursos ao mesmo tempo. Com `add_back`, completa depois de
+    forma gulosa (melhor densidade primeiro) com itens de valor positivo que ainda
+    cabem, em até _ADD_BACK_ROUNDS rodadas. Retorna a máscara booleana das linhas
+    alteradas.
+    """
+    if order is None:
+        order = repair_order(attrs, budget, water_limit, fert_limit)
+    n_rows = len(pop)
+    n_items = len(attrs)
+    limits = np.array([budget, water_limit, fert_limit], dtype=np.float64)
+    res = attrs[order][:, RESOURCE_COLUMNS]
+    value = (attrs[:, REVENUE] - attrs[:, COST] - attrs[:, RISK])[order]
+    # candidatos do add-back: valor positivo, melhor densidade primeiro (posições em `order`)
+    add_candidates = np.flatnonzero(value > 0)[::-1] if add_back else np.empty(0, dtype=np.int64)
+    changed = np.zeros(n_rows, dtype=bool)
+    step = max(1, _EVAL_BLOCK_ELEMS // max(1, n_items))
+    for start in range(0, n_rows, step):
+        stop = min(n_rows, start + step)
+        block = unpack_population(pop[start:stop], n_items) if packed else pop[start:stop]
+        sub = block[:, order]
+        used = sub @ res
+        excess = used - limits
+        bad = np.flatnonzero((excess > 1e-9).any(axis=1))
+        if len(bad):
+            cut = np.full(len(bad), -1)
+            for r in range(len(limits)):
+                need = excess[bad, r] > 1e-9
+                if not need.any():
+                    continue
+                cum = np.cumsum(sub[bad[need]] * res[:, r], axis=1)
+                reach = cum >= excess[bad[need], r][:, None] - 1e-9
+                # se nem removendo tudo o excesso é coberto (limite negativo), remove tudo
+                first = np.where(reach.any(axis=1), np.argmax(reach, axis=1), n_items - 1)
+                cut[need] = np.maximum(cut[need], first)
+            drop = np.arange(n_items) <= cut[:, None]
+            sub[bad] = np.where(drop, 0, sub[bad])
+            used[bad] = sub[bad] @ res
+            changed[start + bad] = True
+        if len(add_candidates):
+            # add-back guloso em rodadas vetorizadas: a cada rodada entra o maior prefixo
+            # de candidatos livres que cabe na folga e o primeiro que não coube é pulado
+            slack = limits - used
+            avail = sub[:, add_candidates] == 0
+            added = np.zeros_like(avail)
+            cand = np.arange(len(add_candidates))
+            for _ in range(_ADD_BACK_ROUNDS):
+                # a folga só diminui: item que não cabe em nenhuma linha sai de vez
+                cand = cand[avail[:, cand].any(axis=0)
+                            & (res[add_candidates[cand]] <= slack.max(axis=0) + 1e-9).all(axis=1)]
+                if not len(cand):
+                    break
+                res_c = res[add_candidates[cand]]
+                # só linhas com folga para o menor item restante
+                live = np.flatnonzero((slack >= res_c.min(axis=0) - 1e-9).all(axis=1))
+                if not len(live):
+                    break
+                av = avail[np.ix_(live, cand)]
+                fits = np.ones_like(av)
+                for r in range(len(limits)):
+                    fits &= np.cumsum(av * res_c[:, r], axis=1) <= slack[live, r:r + 1] + 1e-9
+                take = av & fits
+                slack[live] -= take @ res_c
+                added[np.ix_(live, cand)] |= take
+                av &= ~take
+                blocked = av & ~fits
+                rows = np.flatnonzero(blocked.any(axis=1))
+                if not len(rows):
+                    break
+                # pula o primeiro item que não coube; os seguintes ficam para a próxima rodada
+                av[rows, np.argmax(blocked[rows], axis=1)] = False
+                avail[np.ix_(live, cand)] = av
+            rows = np.flatnonzero(added.any(axis=1))
+            if len(rows):
+                sub[:, add_candidates] |= added.astype(sub.dtype)
+                changed[start + rows] = True
+        if changed[start:stop].any():
+            block[:, order] = sub
+            if packed:
+                pop[start:stop] = pack_population(block)
+    return changed
+
+
+def greedy_solutions(
+    attrs: np.ndarray,
+    budget: float,
+    water_limit: float,
+    fert_limit: float,
+    packed: bool = False
+) -> np.ndarray:
+    """Soluções gulosas viáveis, uma por critério de densidade.
+
+    Critérios: (receita - custo - risco) por unidade de orçamento, de água, de
+    fertilizante e dos três recursos normalizados. Cada solução parte de todos os
+    genes ligados e passa por `repair_population` com add-back na ordem do critério.
+    """
+    n_items = len(attrs)
+    sols = np.ones((len(RESOURCE_COLUMNS) + 1, n_items), dtype=np.int8)
+    if packed:
+        sols = pack_population(sols)
+    for i, resource in enumerate(RESOURCE_COLUMNS + (None,)):
+        order = repair_order(attrs, budget, water_limit, fert_limit, resource=resource)
+        repair_population(sols[i:i + 1], attrs, budget, water_limit, fert_limit, order=order, add_back=True, packed=packed)
+    return sols
+
+
+def seed_population(
+    pop_size: int,
+    attrs: np.ndarray,
+    budget: float,
+    water_limit: float,
+    fert_limit: float,
+    rng: np.random.Generator,
+    fraction: float = 0.5,
+    perturb_rate: float = 0.02,
+    packed: bool = False
+) -> np.ndarray:
+    """População inicial com `fraction` dos indivíduos vindos das soluções gulosas.
+
+    Entram as soluções de `greedy_solutions` e perturbações delas (bit flip com
+    taxa `perturb_rate` seguido de reparo); o restante é aleatório, como em
+    `init_population`, para manter diversidade.
+    """
+    n_items = len(attrs)
+    n_seeded = int(round(pop_size * min(max(fraction, 0.0), 1.0)))
+    init = init_packed_population if packed else init_population
+    pop = init(pop_size, n_items, rng)
+    if n_seeded == 0:
+        return pop
+    base = greedy_solutions(attrs, budget, water_limit, fert_limit, packed)
+    n_base = min(len(base), n_seeded)
+    pop[:n_base] = base[:n_base]
+    if n_seeded > n_base:
+        # perturbações das soluções gulosas, em rodízio
+        perturbed = pop[n_base:n_seeded]
+        perturbed[:] = base[np.arange(n_seeded - n_base) % len(base)]
+        packed_length = n_items if packed else None
+        positions = batch_bit_flip_mutation(perturbed, perturb_rate, rng, packed_length=packed_length)
+        if len(positions):
+            repair_population(perturbed, attrs, budget, water_limit, fert_limit, packed=packed)
+    return pop
+
+
+def lp_upper_bound(
+    attrs: np.ndarray,
+    budget: float,
+    water_limit: float,
+    fert_limit: float,
+    n_sweeps: int = 50
+) -> float:
+    """Limite superior da fitness pela relaxação linear do problema penalizado.
+
+    Pelo dual da relaxação, para qualquer mu com 0 <= mu_r <= PENALTY_WEIGHTS[r]:
+    fitness(x) <= sum(max(0, v_i - mu . r_i)) + mu . limites, com v = receita -
+    custo - risco. Minimiza em mu por descida coordenada com busca exata (a função
+    é convexa e linear por partes); qualquer mu visitado já dá um limite válido.
+    """
+    value = attrs[:, REVENUE] - attrs[:, COST] - attrs[:, RISK]
+    res = attrs[:, RESOURCE_COLUMNS]
+    limits = np.array([budget, water_limit, fert_limit], dtype=np.float64)
+    upper = np.array(PENALTY_WEIGHTS, dtype=np.float64)
+
+    def bound(mu: np.ndarray) -> float:
+        return float(np.maximum(value - res @ mu, 0.0).sum() + mu @ limits)
+
+    mu = np.zeros(len(limits))
+    best = bound(mu)
+    for _ in range(max(1, n_sweeps)):
+        prev = best
+        for r in range(len(limits)):
+            a = value - res @ mu + res[:, r] * mu[r]
+            b = res[:, r]
+            pos = b > 0
+            # derivada em mu_r: limite_r - soma de b_i dos itens com a_i > mu_r * b_i;
+            # o mínimo fica no ponto de quebra a_i / b_i onde a soma passa do limite
+            t = a[pos] / b[pos]
+            idx = np.argsort(-t, kind='stable')
+            cum = np.cumsum(b[pos][idx])
+            k = int(np.searchsorted(cum, limits[r], side='right'))
+            mu[r] = np.clip(t[idx[k]] if k < len(idx) else 0.0, 0.0, upper[r])
+            best = min(best, bound(mu))
+        if prev - best <= 1e-9 * max(1.0, abs(best)):
+            break
+    return best
+
+
+# Versão do formato de checkpoint de `run_ga`
+CHECKPOINT_VERSION = 2
+
+
+def save_checkpoint(path: str, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+    """Grava um checkpoint (.npz sem compressão) de forma atômica.
+
+    `arrays` vão como arrays do npz; `meta` (escalares, contadores, estado do RNG)
+    vai serializado em JSON. O arquivo temporário só substitui `path` depois de
+    gravado e sincronizado, então um processo morto no meio não corrompe o anterior.
+    """
+    path = str(path)
+    tmp = path + '.tmp'
+    meta_bytes = np.frombuffer(json.dumps(dict(meta, version=CHECKPOINT_VERSION)).encode('utf-8'), dtype=np.uint8)
+    with open(tmp, 'wb') as fh:
+        np.savez(fh, meta=meta_bytes, **arrays)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path: str) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Lê um checkpoint de `save_checkpoint` e retorna `(arrays, meta)`."""
+    with np.load(str(path)) as data:
+        arrays = {k: data[k] for k in data.files if k != 'meta'}
+        meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+    if meta.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"Versão de checkpoint não suportada: {meta.get('version')}")
+    return arrays, meta
+
 
 def run_ga(
     prod: np.ndarray,
@@ -147,73 +1188,354 @@ def run_ga(
     verbose: bool = False,
     early_stop: bool = True,
     early_stop_delta: float = 1e-3,
-    early_stop_patience: int = 20
+    early_stop_patience: int = 20,
+    packed: bool = False,
+    delta_eval: bool = False,
+    delta_verify: bool = False,
+    cache: Union[FitnessCache, int, None] = None,
+    initial_population: Optional[np.ndarray] = None,
+    callback: Optional[Callable[[Dict[str, Any]], Optional[bool]]] = None,
+    repair_add_back: bool = False,
+    seeding: float = 0.0,
+    optimality_gap: Optional[float] = None,
+    upper_bound: Optional[float] = None,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_every: int = 100,
+    checkpoint_seconds: Optional[float] = None,
+    resume_from: Optional[str] = None,
+    scenarios: Optional[np.ndarray] = None,
+    scenario_objective: str = 'mean',
+    cvar_alpha: float = 0.1,
+    dedup: bool = False,
+    diversity_control: bool = False,
+    diversity_target: float = 0.05,
+    initial_totals: Optional[np.ndarray] = None,
+    adaptive_operators: bool = False,
+    initial_state: Optional[Dict[str, Any]] = None
 ) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """Executa o GA e retorna `(best, result)`.
+
+    Nomes de seleção, crossover e mutação fora de SELECTION_METHODS,
+    CROSSOVER_METHODS e MUTATION_METHODS levantam ValueError antes da execução.
+
+    `result['timings']` traz os segundos acumulados por fase (PROFILE_PHASES) e
+    `result['counters']` os contadores de avaliações, restarts e ajustes da taxa
+    de mutação. `callback`, se fornecido, é chamado ao fim de cada geração com um
+    snapshot leve (dict); retornar True encerra a execução.
+
+    `seeding` é a fração da população inicial vinda de `seed_population`. Com
+    `optimality_gap`, a execução para quando o melhor fica a essa distância
+    relativa do limite `upper_bound` (calculado por `lp_upper_bound` se omitido).
+
+    Com `checkpoint_path`, o estado completo é salvo a cada `checkpoint_every`
+    gerações ou `checkpoint_seconds` segundos (o que vier primeiro). `resume_from`
+    continua de um checkpoint com os mesmos parâmetros, de forma idêntica à
+    execução sem interrupção (o conteúdo de um `cache` não é salvo).
+
+    Com `scenarios` (matriz `(S, n_items)` de receitas, ver `generate_scenarios`),
+    a receita de cada indivíduo passa a ser `scenario_revenue` com
+    `scenario_objective` ('mean', 'cvar' com `cvar_alpha`, ou 'worst'),
+    calculada uma vez por cromossomo distinto do lote; com `cache`, fica no cache
+    sob uma chave que inclui cenários, objetivo e alpha.
+
+    `dedup` perturba, antes da avaliação, os filhos idênticos a outro indivíduo
+    da nova população. Com `diversity_control`, a taxa de mutação passa a seguir
+    a diversidade (`population_diversity`, em `history['diversity']`): sobe de
+    `mutation_rate` na proporção em que a diversidade fica abaixo de
+    `diversity_target`, no lugar do aumento fixo de 1.5x na estagnação.
+
+    `initial_totals` (totais de `initial_population`, como em `result['totals']`)
+    evita reavaliar a população inicial: só linhas com NaN, reparadas ou
+    completadas aleatoriamente são avaliadas; as fitness saem dos totais com os
+    limites atuais.
+
+    Com `adaptive_operators`, `crossover_method` e `mutation_method` são
+    ignorados: os pares de pais de cada geração são divididos entre os braços
+    de OPERATOR_ARMS (`operator_quotas`) conforme a qualidade de cada um, que
+    acompanha o quanto seus filhos superam os pais (`operator_rewards`). Os
+    filhos por braço e geração ficam em `history['operator_usage']`.
+
+    `initial_state` (o `result['state']` de uma execução anterior) continua o
+    estado adaptativo junto com `initial_population`: taxa de mutação corrente,
+    contador de estagnação e qualidade dos operadores. `mutation_rate` segue
+    como a taxa base.
+    """
+    # nomes inválidos falham antes de qualquer trabalho (com adaptive_operators,
+    # crossover e mutação são ignorados)
+    validate_operators(
+        selection_method,
+        None if adaptive_operators else crossover_method,
+        None if adaptive_operators else mutation_method
+    )
     if rng is None:
         rng = np.random.default_rng()
     n_items = len(prod)
-    pop = init_population(pop_size, n_items, rng)
-    fitnesses = np.array([
-        fitness(ind, prod, cost, water, fert, price, risk, budget, water_limit, fert_limit)
-        for ind in pop
-    ])
-    best_idx = int(np.argmax(fitnesses))
-    best = pop[best_idx].copy()
-    best_fit = fitnesses[best_idx]
-    history = {'best_fitness': [], 'mean_fitness': []}
-    no_improve = 0
-    start_time = time.perf_counter()
-
-    stop_counter = 0
-    last_best_fit = best_fit
-    for gen in range(n_gens):
-        new_pop = []
+    if scenarios is not None:
+        scenarios = np.asarray(scenarios, dtype=np.float64)
+        if scenarios.ndim != 2 or scenarios.shape[1] != n_items:
+            raise ValueError("scenarios deve ter formato (S, número de áreas)")
+        if scenario_objective not in SCENARIO_OBJECTIVES:
+            raise ValueError(f"Objetivo de cenários desconhecido: {scenario_objective}")
+        # chave da receita robusta no cache: matriz de cenários, objetivo e alpha
+        scenario_tag = hashlib.blake2b(scenarios.tobytes(), digest_size=16)
+        scenario_tag.update(f'{scenario_objective}:{cvar_alpha!r}'.encode('utf-8'))
+        scenario_tag = scenario_tag.digest()
+    attrs = build_attribute_matrix(prod, cost, water, fert, price, risk)
+    # cache: FitnessCache compartilhável ou número máximo de entradas de um cache novo
+    # (com delta_eval os filhos saem da avaliação incremental; o cache cobre init, restarts
+    # e a receita robusta dos cenários)
+    if isinstance(cache, (int, np.integer)) and not isinstance(cache, bool):
+        cache = FitnessCache(int(cache)) if cache > 0 else None
+    if cache is not None:
+        cache.bind(attrs)
+        cache_start = cache.stats()
+
+    timings = dict.fromkeys(PROFILE_PHASES, 0.0)
+    counters = {'generations': 0, 'evaluations': 0, 'restarts': 0, 'mutation_rate_changes': 0, 'repairs': 0, 'duplicates': 0}
+    base_rate = mutation_rate
+    # repair_violations: indivíduos inviáveis são reparados antes de cada avaliação
+    order = repair_order(attrs, budget, water_limit, fert_limit) if repair_violations else None
+
+    def repair_block(block) -> np.ndarray:
+        tic = time.perf_counter()
+        changed = repair_population(
+            block, attrs, budget, water_limit, fert_limit,
+            order=order, add_back=repair_add_back, packed=packed
+        )
+        counters['repairs'] += int(changed.sum())
+        _tick(timings, 'repair', tic)
+        return changed
+
+    def unique_scenario_revenue(block):
+        # clones do lote passam uma única vez pelo produto com os cenários
+        first, inverse = unique_rows(block)
+        return scenario_revenue(block[first], scenarios, scenario_objective, cvar_alpha, packed)[inverse]
+
+    def robust_revenue(block):
+        # a receita esperada dá lugar à receita robusta; com cache, só os ausentes são calculados
+        if cache is not None:
+            return cache.population_totals(block, attrs, packed, revenue=(scenario_tag, unique_scenario_revenue))[:, REVENUE]
+        return unique_scenario_revenue(block)
+
+    def evaluate(block):
+        tic = time.perf_counter()
+        counters['evaluations'] += len(block)
+        if cache is not None:
+            revenue = (scenario_tag, unique_scenario_revenue) if scenarios is not None else None
+            block_totals = cache.population_totals(block, attrs, packed, revenue=revenue)
+        else:
+            if packed:
+                block_totals = packed_population_totals(block, attrs)
+            else:
+                block_totals = population_totals(block, attrs)
+            if scenarios is not None:
+                block_totals[:, REVENUE] = unique_scenario_revenue(block)
+        out = fitness_from_totals(block_totals, budget, water_limit, fert_limit), block_totals
+        _tick(timings, 'evaluation', tic)
+        return out
+
+    # packed=True: cromossomos com 8 genes por byte do início ao fim; `best` sai desempacotado
+    packed_length = n_items if packed else None
+    init = init_packed_population if packed else init_population
+    if resume_from is not None:
+        arrays, meta = load_checkpoint(resume_from)
+        pop = arrays['population']
+        if pop.shape != (pop_size, (n_items + 7) // 8 if packed else n_items) or bool(meta['packed']) != packed:
+            raise ValueError("Checkpoint incompatível com pop_size/número de áreas/packed")
+        fitnesses, totals = arrays['fitnesses'], arrays['totals']
+        rng.bit_generator.state = meta['rng_state']
+        counters.update(meta['counters'])
+        timings.update(meta['timings'])
+        if adaptive_operators:
+            quality = np.asarray(meta['operator_quality'], dtype=np.float64)
+    elif initial_population is None and seeding > 0:
+        pop = seed_population(pop_size, attrs, budget, water_limit, fert_limit, rng, fraction=seeding, packed=packed)
+    elif initial_population is None:
+        pop = init(pop_size, n_items, rng)
+    else:
+        # continua de uma população salva (mesma representação de `packed`); faltantes são aleatórios
+        seeded = np.asarray(initial_population)[:pop_size]
+        pop = np.concatenate([seeded, init(pop_size - len(seeded), n_items, rng)]).astype(np.uint8 if packed else np.int8)
+    if resume_from is not None:
+        best = arrays['best']
+        best_fit = np.float64(meta['best_fitness'])
+        history = {k[len('history_'):]: v.tolist() for k, v in arrays.items() if k.startswith('history_')}
+        no_improve = meta['no_improve']
+        stop_counter = meta['stop_counter']
+        last_best_fit = np.float64(meta['last_best_fitness'])
+        mutation_rate = meta['mutation_rate']
+        first_gen = meta['generation'] + 1
+        # o tempo já decorrido antes da interrupção entra em time_seconds
+        start_time = time.perf_counter() - meta['elapsed']
+    else:
+        changed = repair_block(pop) if repair_violations else np.zeros(pop_size, dtype=bool)
+        if initial_totals is not None and initial_population is not None:
+            # só as penalidades dependem dos limites: totais conhecidos são reaproveitados
+            known = np.asarray(initial_totals, dtype=np.float64)[:len(seeded)]
+            totals = np.empty((pop_size, attrs.shape[1]), dtype=np.float64)
+            totals[:len(known)] = known
+            fresh = changed.copy()
+            fresh[len(known):] = True
+            fresh[:len(known)] |= np.isnan(known).any(axis=1)
+            if fresh.any():
+                _, totals[fresh] = evaluate(pop[fresh])
+            fitnesses = fitness_from_totals(totals, budget, water_limit, fert_limit)
+        else:
+            fitnesses, totals = evaluate(pop)
+        best_idx = int(np.argmax(fitnesses))
+        best = pop[best_idx].copy()
+        best_fit = fitnesses[best_idx]
+        history = {'best_fitness': [], 'mean_fitness': []}
+        if diversity_control:
+            history['diversity'] = []
+        if adaptive_operators:
+            history['operator_usage'] = []
+            quality = np.ones(len(OPERATOR_ARMS))
+        no_improve = 0
+        if initial_state is not None:
+            mutation_rate = initial_state.get('mutation_rate', mutation_rate)
+            no_improve = initial_state.get('no_improve', 0)
+            if adaptive_operators and initial_state.get('operator_quality') is not None:
+                quality = np.asarray(initial_state['operator_quality'], dtype=np.float64)
+        stop_counter = 0
+        last_best_fit = best_fit
+        first_gen = 0
+        start_time = time.perf_counter()
+
+    def checkpoint(gen: int):
+        save_checkpoint(checkpoint_path, {
+            'population': pop,
+            'fitnesses': fitnesses,
+            'totals': totals,
+            'best': best,
+            # cada histórico com o próprio dtype: operator_usage volta como listas de int
+            **{f'history_{k}': np.asarray(v) for k, v in history.items()},
+        }, {
+            'generation': gen,
+            'packed': packed,
+            'best_fitness': float(best_fit),
+            'last_best_fitness': float(last_best_fit),
+            'no_improve': no_improve,
+            'stop_counter': stop_counter,
+            'mutation_rate': mutation_rate,
+            'rng_state': rng.bit_generator.state,
+            'counters': counters,
+            'timings': timings,
+            'elapsed': time.perf_counter() - start_time,
+            **({'operator_quality': quality.tolist()} if adaptive_operators else {}),
+        })
+
+    last_checkpoint = time.perf_counter()
+    if optimality_gap is not None and upper_bound is None:
+        bound_attrs = attrs
+        if scenarios is not None:
+            # média, CVaR e pior caso ficam abaixo da receita média dos cenários
+            bound_attrs = attrs.copy()
+            bound_attrs[:, REVENUE] = scenarios.mean(axis=0)
+        upper_bound = lp_upper_bound(bound_attrs, budget, water_limit, fert_limit)
+    # fitness a partir da qual a solução está dentro do gap de otimalidade
+    target_fit = None
+    if optimality_gap is not None:
+        target_fit = upper_bound - optimality_gap * max(abs(upper_bound), 1e-12)
+    # buffers alternados: filhos escritos direto na próxima população
+    elitism = min(elitism, pop_size)
+    n_pairs = (pop_size - elitism + 1) // 2
+    new_pop = np.empty_like(pop)
+    # delta_eval: totais por indivíduo acompanham seleção, crossover e mutação;
+    # delta_verify confere cada geração contra a avaliação completa
+    new_totals = np.empty_like(totals) if delta_eval else None
+    stop_reason = 'n_gens'
+    for gen in range(first_gen, n_gens):
+        tic = time.perf_counter()
         # elitism: preserve top individuals
         if elitism > 0:
             elite_idx = np.argsort(-fitnesses)[:elitism]
-            for ei in elite_idx:
-                new_pop.append(pop[ei].copy())
-
-        while len(new_pop) < pop_size:
-            # selection
-            if selection_method == 'roulette':
-                p1 = roulette_selection(pop, fitnesses, rng)
-                p2 = roulette_selection(pop, fitnesses, rng)
-            elif selection_method == 'rank':
-                p1 = rank_selection(pop, fitnesses, rng)
-                p2 = rank_selection(pop, fitnesses, rng)
-            else:
-                p1 = tournament_selection(pop, fitnesses, rng, k=tournament_k)
-                p2 = tournament_selection(pop, fitnesses, rng, k=tournament_k)
-
-            # crossover
-            if crossover_method == 'two_point':
-                c1, c2 = two_point_crossover(p1, p2, rng)
-            elif crossover_method == 'uniform':
-                c1, c2 = uniform_crossover(p1, p2, rng)
-            else:
-                c1, c2 = one_point_crossover(p1, p2, rng)
-
-            # mutation
-            if mutation_method == 'swap':
-                if rng.random() < mutation_rate:
-                    swap_mutation(c1, rng)
-                if rng.random() < mutation_rate:
-                    swap_mutation(c2, rng)
-            else:
-                bit_flip_mutation(c1, mutation_rate, rng)
-                bit_flip_mutation(c2, mutation_rate, rng)
-
-            # O repair pode ser adaptado para múltiplos constraints se necessário
-            new_pop.append(c1)
-            if len(new_pop) < pop_size:
-                new_pop.append(c2)
-
-        pop = np.array(new_pop)
-        fitnesses = np.array([
-            fitness(ind, prod, cost, water, fert, price, risk, budget, water_limit, fert_limit)
-            for ind in pop
-        ])
+            new_pop[:elitism] = pop[elite_idx]
+            if delta_eval:
+                new_totals[:elitism] = totals[elite_idx]
+        tic = _tick(timings, 'elitism', tic)
+
+        # selection + crossover + mutation de toda a geração em blocos
+        parents = select_parent_indices(fitnesses, 2 * n_pairs, rng, selection_method, tournament_k).reshape(n_pairs, 2)
+        _tick(timings, 'selection', tic)
+        if adaptive_operators:
+            # braço de cada par em trechos contíguos (os pares já saem em ordem aleatória)
+            quotas = operator_quotas(quality, n_pairs)
+            bounds = np.concatenate([[0], np.cumsum(quotas)])
+            arm_of_child = np.repeat(np.arange(len(OPERATOR_ARMS)), 2 * quotas)[:pop_size - elitism]
+            parent_fit = np.repeat(np.maximum(fitnesses[parents[:, 0]], fitnesses[parents[:, 1]]), 2)[:pop_size - elitism]
+            blocks = [(a, bounds[a], bounds[a + 1]) for a in range(len(OPERATOR_ARMS)) if quotas[a]]
+        else:
+            blocks = [(None, 0, n_pairs)]
+        for arm, lo, hi in blocks:
+            cross, mut = OPERATOR_ARMS[arm] if arm is not None else (crossover_method, mutation_method)
+            rows = slice(elitism + 2 * lo, min(pop_size, elitism + 2 * hi))
+            generate_offspring(
+                pop, parents[lo:hi], rng,
+                crossover_method=cross,
+                mutation_method=mut,
+                mutation_rate=mutation_rate,
+                out=new_pop[rows],
+                packed_length=packed_length,
+                totals=totals if delta_eval else None,
+                attrs=attrs,
+                out_totals=new_totals[rows] if delta_eval else None,
+                timings=timings
+            )
+        if repair_violations:
+            changed = elitism + np.flatnonzero(repair_block(new_pop[elitism:]))
+            if delta_eval and len(changed):
+                # totais incrementais das linhas reparadas ficaram desatualizados
+                tic = time.perf_counter()
+                full = packed_population_totals if packed else population_totals
+                new_totals[changed] = full(new_pop[changed], attrs)
+                _tick(timings, 'evaluation', tic)
+        if dedup:
+            tic = time.perf_counter()
+            n_flips = max(1, int(round(base_rate * n_items)))
+            for round_ in range(_DEDUP_ROUNDS):
+                dup = elitism + np.flatnonzero(duplicate_mask(new_pop, packed)[elitism:])
+                if not len(dup):
+                    break
+                if round_ == 0:
+                    counters['duplicates'] += len(dup)
+                rows = new_pop[dup]
+                perturb_rows(rows, n_flips, rng, packed_length)
+                if repair_violations:
+                    tic = _tick(timings, 'diversity', tic)
+                    repair_block(rows)
+                    tic = time.perf_counter()
+                new_pop[dup] = rows
+                if delta_eval:
+                    full = packed_population_totals if packed else population_totals
+                    new_totals[dup] = full(rows, attrs)
+            _tick(timings, 'diversity', tic)
+        pop, new_pop = new_pop, pop
+        if delta_eval:
+            tic = time.perf_counter()
+            totals, new_totals = new_totals, totals
+            if scenarios is not None:
+                # só custo, água, fertilizante e risco são incrementais; a receita robusta não é linear
+                totals[elitism:, REVENUE] = robust_revenue(pop[elitism:])
+            fitnesses = fitness_from_totals(totals, budget, water_limit, fert_limit)
+            counters['evaluations'] += pop_size - elitism
+            _tick(timings, 'evaluation', tic)
+            if delta_verify:
+                full_fit, full_totals = batch_fitness(pop, attrs, budget, water_limit, fert_limit, packed)
+                if scenarios is not None:
+                    full_totals[:, REVENUE] = scenario_revenue(pop, scenarios, scenario_objective, cvar_alpha, packed)
+                if not np.allclose(totals, full_totals, rtol=1e-9, atol=1e-6):
+                    err = float(np.max(np.abs(totals - full_totals)))
+                    raise RuntimeError(f"Avaliação incremental divergiu na geração {gen} (erro máximo {err:.3g})")
+        else:
+            fitnesses, totals = evaluate(pop)
+        if adaptive_operators:
+            rewards = operator_rewards(fitnesses[elitism:], parent_fit, arm_of_child, len(OPERATOR_ARMS))
+            # geração sem nenhuma melhora não altera as qualidades
+            if rewards.max() > 0:
+                used = quotas > 0
+                quality[used] += _OPERATOR_ADAPTATION * (rewards[used] - quality[used])
+            history['operator_usage'].append(np.bincount(arm_of_child, minlength=len(OPERATOR_ARMS)).tolist())
         gen_best_idx = int(np.argmax(fitnesses))
         gen_best_fit = float(fitnesses[gen_best_idx])
         history['best_fitness'].append(gen_best_fit)
@@ -234,36 +1556,140 @@ def run_ga(
                 stop_counter = 0
         last_best_fit = gen_best_fit
 
+        if diversity_control:
+            # mutação guiada pela diversidade: base_rate * alvo / diversidade, entre base_rate e 0.5
+            tic = time.perf_counter()
+            diversity = population_diversity(pop, packed_length)
+            history['diversity'].append(diversity)
+            new_rate = float(np.clip(base_rate * diversity_target / max(diversity, 1e-12), base_rate, 0.5))
+            counters['mutation_rate_changes'] += new_rate != mutation_rate
+            mutation_rate = new_rate
+            _tick(timings, 'diversity', tic)
         # adaptive mutation: if stagnated, increase mutation rate slightly
-        if no_improve > 0 and (no_improve % (stagnation_patience // 3 + 1) == 0):
-            mutation_rate = min(0.5, mutation_rate * 1.5)
+        elif no_improve > 0 and (no_improve % (stagnation_patience // 3 + 1) == 0):
+            new_rate = min(0.5, mutation_rate * 1.5)
+            counters['mutation_rate_changes'] += new_rate != mutation_rate
+            mutation_rate = new_rate
 
         if no_improve >= stagnation_patience:
             # partial restart: replace half population randomly
+            tic = time.perf_counter()
             num_replace = pop_size // 2
-            pop[:num_replace] = init_population(num_replace, n_items, rng)
-            fitnesses[:num_replace] = np.array([
-                fitness(ind, prod, cost, water, fert, price, risk, budget, water_limit, fert_limit)
-                for ind in pop[:num_replace]
-            ])
+            pop[:num_replace] = init(num_replace, n_items, rng)
+            _tick(timings, 'restart', tic)
+            if repair_violations:
+                repair_block(pop[:num_replace])
+            fitnesses[:num_replace], totals[:num_replace] = evaluate(pop[:num_replace])
+            counters['restarts'] += 1
             no_improve = 0
+        counters['generations'] += 1
 
         # Logging opcional
         if verbose and (gen % 10 == 0 or gen == n_gens - 1):
             print(f"Geração {gen:3d}: Best Fitness = {gen_best_fit:.2f}, Mean Fitness = {history['mean_fitness'][-1]:.2f}")
 
+        if callback is not None:
+            snapshot = {
+                'generation': gen,
+                'best_fitness': float(best_fit),
+                'generation_best_fitness': gen_best_fit,
+                'mean_fitness': history['mean_fitness'][-1],
+                'mutation_rate': mutation_rate,
+                'evaluations': counters['evaluations'],
+                'elapsed': time.perf_counter() - start_time,
+            }
+            if callback(snapshot):
+                stop_reason = 'callback'
+                if verbose:
+                    print(f"Execução interrompida pelo callback na geração {gen}. Melhor fitness: {best_fit:.2f}")
+                break
+
+        if target_fit is not None and best_fit >= target_fit:
+            stop_reason = 'optimality_gap'
+            if verbose:
+                print(f"Gap de otimalidade atingido na geração {gen}. Melhor fitness: {best_fit:.2f} (limite {upper_bound:.2f})")
+            break
+
         # Early stopping: interrompe se estagnado
         if early_stop and stop_counter >= early_stop_patience:
+            stop_reason = 'early_stop'
             if verbose:
                 print(f"Early stopping ativado na geração {gen}. Melhor fitness: {best_fit:.2f}")
             break
 
+        if checkpoint_path is not None and gen < n_gens - 1:
+            due = checkpoint_every > 0 and (gen + 1) % checkpoint_every == 0
+            if due or (checkpoint_seconds is not None and time.perf_counter() - last_checkpoint >= checkpoint_seconds):
+                checkpoint(gen)
+                last_checkpoint = time.perf_counter()
+
     elapsed = time.perf_counter() - start_time
-    result = {'best': best, 'best_fitness': best_fit, 'time_seconds': elapsed, 'history': history}
+    if packed:
+        best = unpack_population(best, n_items)
+    result = {
+        'best': best, 'best_fitness': best_fit, 'time_seconds': elapsed, 'history': history,
+        # estado final, para continuar a execução (ilhas, tuning)
+        'population': pop, 'fitnesses': fitnesses, 'totals': totals, 'mutation_rate': mutation_rate,
+        'timings': timings, 'counters': counters, 'stop_reason': stop_reason,
+        'state': {
+            'mutation_rate': mutation_rate, 'no_improve': no_improve,
+            'operator_quality': quality.tolist() if adaptive_operators else None
+        }
+    }
+    if adaptive_operators:
+        result['operators'] = [f'{c}+{m}' for c, m in OPERATOR_ARMS]
+        result['operator_quality'] = quality.tolist()
+    if upper_bound is not None:
+        result['upper_bound'] = float(upper_bound)
+        result['gap'] = float((upper_bound - best_fit) / max(abs(upper_bound), 1e-12))
+    if scenarios is not None:
+        # distribuição do lucro do melhor indivíduo entre os cenários
+        best_totals = population_totals(best[None, :], attrs)
+        # custo + risco + penalidades: o que a fitness desconta da receita
+        charges = best_totals[0, REVENUE] - fitness_from_totals(best_totals, budget, water_limit, fert_limit)[0]
+        profit = scenarios @ best.astype(np.float64) - charges
+        k = max(1, int(np.ceil(cvar_alpha * len(profit))))
+        result['scenario_profit'] = {
+            'objective': scenario_objective,
+            'n_scenarios': len(profit),
+            'mean': float(profit.mean()),
+            'cvar': float(np.sort(profit)[:k].mean()),
+            'worst': float(profit.min()),
+            'best': float(profit.max()),
+        }
+    if cache is not None:
+        # estatísticas desta execução (o cache pode ter sido compartilhado)
+        result['cache'] = {k: v - cache_start[k] for k, v in cache.stats().items() if k != 'size'}
+        result['cache']['size'] = len(cache)
 
     return best, result
 
 
+# Dataset dos workers da busca em grade (enviado uma vez por processo)
+_GRID_DATA: Optional[Tuple[np.ndarray, ...]] = None
+
+
+def _init_grid_worker(data: Tuple[np.ndarray, ...]):
+    global _GRID_DATA
+    _GRID_DATA = data
+
+
+def _grid_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    data = task.pop('data', None) or _GRID_DATA
+    seed_seq = task.pop('seed_seq')
+    cache_size, cache_bytes = task.pop('cache_size'), task.pop('cache_bytes')
+    # cache próprio por execução: o resultado não depende da ordem/distribuição das tarefas
+    cache = FitnessCache(cache_size or None, cache_bytes) if (cache_size or cache_bytes) else None
+    best, res = run_ga(*data, rng=np.random.default_rng(seed_seq), cache=cache, **task)
+    return {
+        'best': best,
+        'best_fitness': float(res['best_fitness']),
+        'time_seconds': res['time_seconds'],
+        'history': res['history'],
+        'cache': res.get('cache'),
+    }
+
+
 # Função para testar todas as combinações de métodos e escolher o melhor
 def run_ga_grid_search(
     prod: np.ndarray,
@@ -280,45 +1706,122 @@ def run_ga_grid_search(
     mutation_rate: float = 0.01,
     elitism: int = 0,
     rng: Optional[np.random.Generator] = None,
-    verbose: bool = True
+    verbose: bool = True,
+    cache_size: int = 0,
+    cache_bytes: Optional[int] = None,
+    seed: Optional[int] = None,
+    n_repeats: int = 1,
+    n_workers: int = 1,
+    selection_methods: Optional[list] = None,
+    crossover_methods: Optional[list] = None,
+    mutation_methods: Optional[list] = None,
+    callback: Optional[Callable[[Dict[str, Any]], Optional[bool]]] = None,
+    **ga_kwargs
 ) -> Tuple[np.ndarray, Dict[str, Any]]:
-    if rng is None:
-        rng = np.random.default_rng()
-    selection_methods = ['tournament', 'roulette', 'rank']
-    crossover_methods = ['one_point', 'two_point', 'uniform']
-    mutation_methods = ['bit_flip', 'swap']
-    results = []
+    """Roda todas as combinações seleção x crossover x mutação, `n_repeats` vezes cada.
+
+    Cada execução recebe uma semente filha própria, gerada de `SeedSequence(seed)`
+    (ou de um sorteio de `rng` quando `seed` é None), e as execuções são
+    distribuídas em `n_workers` processos. Os resultados independem do número
+    de workers. Retorna o melhor vetor e o resumo da melhor combinação, com a
+    tabela agregada de todas em `grid`. Demais argumentos nomeados (`ga_kwargs`)
+    valem para todas as execuções (ex.: `early_stop`, `packed`, `scenarios`).
+
+    `callback` (só com `n_workers=1`) recebe o snapshot de cada geração de
+    `run_ga`, com `run` e `runs` (execução atual e total); retornar True
+    encerra a busca, e o resumo cobre as execuções feitas até ali
+    (`result['cancelled']`).
+    """
+    for key in ('rng', 'selection_method', 'crossover_method', 'mutation_method', 'cache', 'callback',
+                'adaptive_operators', 'checkpoint_path', 'resume_from'):
+        if key in ga_kwargs:
+            raise ValueError(f"Parâmetro controlado pela busca em grade: {key}")
+    if callback is not None and n_workers > 1:
+        raise ValueError("callback requer n_workers=1")
+    if seed is None:
+        if rng is None:
+            rng = np.random.default_rng()
+        seed = int(rng.integers(0, 2**63))
+    combos = [
+        (sel, cross, mut)
+        for sel in (selection_methods or ['tournament', 'roulette', 'rank'])
+        for cross in (crossover_methods or ['one_point', 'two_point', 'uniform'])
+        for mut in (mutation_methods or ['bit_flip', 'swap'])
+    ]
+    for combo in combos:
+        validate_operators(*combo)
+    n_repeats = max(1, n_repeats)
+    seeds = np.random.SeedSequence(seed).spawn(len(combos) * n_repeats)
+    data = (prod, cost, water, fert, price, risk)
+    tasks = []
+    for c, (sel, cross, mut) in enumerate(combos):
+        for r in range(n_repeats):
+            tasks.append({
+                'seed_seq': seeds[c * n_repeats + r],
+                'cache_size': cache_size,
+                'cache_bytes': cache_bytes,
+                'budget': budget,
+                'water_limit': water_limit,
+                'fert_limit': fert_limit,
+                'pop_size': pop_size,
+                'n_gens': n_gens,
+                'mutation_rate': mutation_rate,
+                'selection_method': sel,
+                'crossover_method': cross,
+                'mutation_method': mut,
+                'elitism': elitism,
+                **ga_kwargs,
+            })
     print("\n--- Iniciando busca por melhores métodos do GA ---\n")
-    for sel in selection_methods:
-        for cross in crossover_methods:
-            for mut in mutation_methods:
-                best, res = run_ga(
-                    prod, cost, water, fert, price, risk,
-                    budget, water_limit, fert_limit,
-                    pop_size=pop_size,
-                    n_gens=n_gens,
-                    mutation_rate=mutation_rate,
-                    selection_method=sel,
-                    crossover_method=cross,
-                    mutation_method=mut,
-                    elitism=elitism,
-                    rng=rng
-                )
-                results.append({
-                    'best_fitness': res['best_fitness'],
-                    'best': best,
-                    'selection': sel,
-                    'crossover': cross,
-                    'mutation': mut,
-                    'time_seconds': res['time_seconds'],
-                    'history': res['history']
-                })
-                if verbose:
-                    print(f"Métodos: seleção={sel}, crossover={cross}, mutação={mut}")
-                    print(f"  Melhor fitness: {res['best_fitness']:.2f}")
-                    print(f"  Tempo de execução: {res['time_seconds']:.2f} s\n")
+    cancelled = False
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_grid_worker, initargs=(data,)) as executor:
+            runs = list(executor.map(_grid_task, tasks))
+    else:
+        runs = []
+        for i, task in enumerate(tasks):
+            task = dict(task, data=data)
+            if callback is not None:
+                def run_callback(snapshot, i=i):
+                    nonlocal cancelled
+                    cancelled = bool(callback(dict(snapshot, run=i, runs=len(tasks))))
+                    return cancelled
+                task['callback'] = run_callback
+            runs.append(_grid_task(task))
+            if cancelled:
+                break
+
+    results = []
+    for c, (sel, cross, mut) in enumerate(combos):
+        combo_runs = runs[c * n_repeats:(c + 1) * n_repeats]
+        if not combo_runs:
+            # busca encerrada pelo callback antes desta combinação
+            continue
+        fits = np.array([run['best_fitness'] for run in combo_runs])
+        times = np.array([run['time_seconds'] for run in combo_runs])
+        top = combo_runs[int(np.argmax(fits))]
+        results.append({
+            'best_fitness': float(fits.max()),
+            'mean_fitness': float(fits.mean()),
+            'std_fitness': float(fits.std()),
+            'best': top['best'],
+            'selection': sel,
+            'crossover': cross,
+            'mutation': mut,
+            'time_seconds': float(times.mean()),
+            'history': top['history'],
+            'runs': len(combo_runs),
+            'cache': top['cache']
+        })
+        if verbose:
+            print(f"Métodos: seleção={sel}, crossover={cross}, mutação={mut}")
+            print(f"  Melhor fitness: {fits.max():.2f} (média {fits.mean():.2f} ± {fits.std():.2f} em {n_repeats} execuções)")
+            print(f"  Tempo de execução: {times.mean():.2f} s\n")
     # Seleciona o melhor resultado
     best_result = max(results, key=lambda x: x['best_fitness'])
+    best_result = dict(best_result, seed=seed, cancelled=cancelled, grid=[
+        {k: v for k, v in res.items() if k not in ('best', 'history')} for res in results
+    ])
     print("--- Melhor combinação encontrada ---")
     print(f"Seleção: {best_result['selection']}, Crossover: {best_result['crossover']}, Mutação: {best_result['mutation']}")
     print(f"Melhor fitness: {best_result['best_fitness']:.2f}")
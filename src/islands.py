@@ -0,0 +1,277 @@
+"""Modelo de ilhas: várias subpopulações do GA em paralelo com migração periódica.
+
+Cada ilha roda `run_ga` por `migration_interval` gerações em um processo do pool;
+entre as épocas, os melhores indivíduos migram segundo a topologia escolhida e
+substituem os piores do destino. O dataset vai para memória compartilhada uma
+única vez e os RNGs das ilhas derivam de um único `SeedSequence`, então o
+resultado não depende do número de workers.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Tuple, Dict, Any, Optional, List
+import os
+import time
+import numpy as np
+
+try:
+    from .ga_core import run_ga
+except Exception:
+    from ga_core import run_ga
+
+
+TOPOLOGIES = ('ring', 'complete', 'random')
+
+# Parâmetros de `run_ga` que podem variar por ilha
+ISLAND_KEYS = (
+    'selection_method', 'tournament_k', 'crossover_method', 'mutation_method',
+    'mutation_rate', 'elitism', 'stagnation_patience'
+)
+
+# Datasets anexados por processo worker: nome do bloco compartilhado -> (shm, arrays)
+_ATTACHED: Dict[str, Tuple[shared_memory.SharedMemory, np.ndarray]] = {}
+
+
+def _attach_dataset(name: str, n_items: int) -> np.ndarray:
+    if name not in _ATTACHED:
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13: anexa sem registrar no resource tracker; quem cria o
+            # bloco é o único responsável por liberá-lo
+            from multiprocessing import resource_tracker
+            register = resource_tracker.register
+            resource_tracker.register = lambda *args, **kwargs: None
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+        _ATTACHED[name] = (shm, np.ndarray((6, n_items), dtype=np.float64, buffer=shm.buf))
+    return _ATTACHED[name][1]
+
+
+def _island_epoch(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Roda uma época de uma ilha; executado nos processos do pool."""
+    if task['shm_name'] is not None:
+        data = _attach_dataset(task['shm_name'], task['n_items'])
+    else:
+        data = task['data']
+    rng = np.random.default_rng()
+    rng.bit_generator.state = task['rng_state']
+    best, res = run_ga(
+        *data,
+        budget=task['budget'],
+        water_limit=task['water_limit'],
+        fert_limit=task['fert_limit'],
+        pop_size=task['pop_size'],
+        n_gens=task['n_gens'],
+        rng=rng,
+        early_stop=False,
+        initial_population=task['population'],
+        initial_totals=task['totals'],
+        initial_state=task['state'],
+        **task['params']
+    )
+    return {
+        'best': best,
+        'best_fitness': float(res['best_fitness']),
+        'population': res['population'],
+        'totals': res['totals'],
+        'fitnesses': res['fitnesses'],
+        'mutation_rate': res['mutation_rate'],
+        'state': res['state'],
+        'history': res['history'],
+        'rng_state': rng.bit_generator.state,
+        'time_seconds': res['time_seconds'],
+    }
+
+
+def _migration_sources(n_islands: int, topology: str, rng: np.random.Generator) -> List[List[int]]:
+    # sources[d] = ilhas que enviam migrantes para d
+    if topology == 'complete':
+        return [[s for s in range(n_islands) if s != d] for d in range(n_islands)]
+    if topology == 'random':
+        targets = (np.arange(n_islands) + rng.integers(1, n_islands, size=n_islands)) % n_islands
+        return [[s for s in range(n_islands) if targets[s] == d] for d in range(n_islands)]
+    return [[(d - 1) % n_islands] for d in range(n_islands)]
+
+
+def run_island_ga(
+    prod: np.ndarray,
+    cost: np.ndarray,
+    water: np.ndarray,
+    fert: np.ndarray,
+    price: np.ndarray,
+    risk: np.ndarray,
+    budget: float,
+    water_limit: float,
+    fert_limit: float,
+    n_islands: int = 4,
+    pop_size: int = 100,
+    n_gens: int = 200,
+    migration_interval: int = 10,
+    n_migrants: int = 2,
+    topology: str = 'ring',
+    island_configs: Optional[List[Dict[str, Any]]] = None,
+    seed: Optional[int] = None,
+    n_workers: Optional[int] = None,
+    verbose: bool = False,
+    **ga_kwargs
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """GA em ilhas. `pop_size` é por ilha.
+
+    `island_configs[i]` sobrescreve, para a ilha i, parâmetros de ISLAND_KEYS;
+    demais argumentos nomeados (`ga_kwargs`) valem para todas as ilhas e são
+    repassados a `run_ga` (ex.: `packed`, `delta_eval`). `n_workers <= 1` roda
+    as ilhas no processo atual.
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Topologia desconhecida: {topology}")
+    if n_islands < 1:
+        raise ValueError("n_islands deve ser >= 1")
+    island_configs = list(island_configs or [])
+    for key in ga_kwargs:
+        if key in ('rng', 'early_stop', 'initial_population', 'initial_totals', 'initial_state', 'verbose'):
+            raise ValueError(f"Parâmetro não suportado no modelo de ilhas: {key}")
+    params = []
+    for i in range(n_islands):
+        cfg = dict(ga_kwargs)
+        if i < len(island_configs):
+            unknown = set(island_configs[i]) - set(ISLAND_KEYS)
+            if unknown:
+                raise ValueError(f"Parâmetros de ilha desconhecidos: {sorted(unknown)}")
+            cfg.update(island_configs[i])
+        params.append(cfg)
+
+    # RNG de cada ilha e da migração derivados de um único SeedSequence
+    ss = np.random.SeedSequence(seed)
+    children = ss.spawn(n_islands + 1)
+    rng_states = [np.random.default_rng(c).bit_generator.state for c in children[:n_islands]]
+    migration_rng = np.random.default_rng(children[-1])
+
+    data = np.ascontiguousarray(np.vstack([prod, cost, water, fert, price, risk]), dtype=np.float64)
+    n_items = data.shape[1]
+    if n_workers is None:
+        n_workers = min(n_islands, os.cpu_count() or 1)
+    n_migrants = max(0, min(n_migrants, pop_size // 2))
+    migration_interval = max(1, migration_interval)
+
+    shm = None
+    executor = None
+    populations: List[Optional[np.ndarray]] = [None] * n_islands
+    # totais de cada população: a época seguinte não reavalia quem ela já conhece
+    totals: List[Optional[np.ndarray]] = [None] * n_islands
+    # estado adaptativo de cada ilha (taxa de mutação, estagnação, operadores) entre épocas
+    states: List[Optional[Dict[str, Any]]] = [None] * n_islands
+    islands = [{
+        'params': {k: params[i].get(k) for k in ISLAND_KEYS if k in params[i]},
+        'history': {'best_fitness': [], 'mean_fitness': []},
+        'best_fitness': -np.inf,
+        'migrants_in': 0,
+        'migrants_out': 0,
+        'mutation_rate': params[i].get('mutation_rate'),
+        'time_seconds': 0.0,
+    } for i in range(n_islands)]
+    bests: List[Optional[np.ndarray]] = [None] * n_islands
+    migrations = {'events': 0, 'individuals': 0, 'accepted': 0}
+    start_time = time.perf_counter()
+    try:
+        if n_workers > 1:
+            shm = shared_memory.SharedMemory(create=True, size=data.nbytes)
+            np.ndarray(data.shape, dtype=data.dtype, buffer=shm.buf)[:] = data
+            executor = ProcessPoolExecutor(max_workers=n_workers)
+        gen = 0
+        while gen < n_gens:
+            epoch_gens = min(migration_interval, n_gens - gen)
+            tasks = [{
+                'shm_name': shm.name if shm is not None else None,
+                'data': data if shm is None else None,
+                'n_items': n_items,
+                'budget': budget,
+                'water_limit': water_limit,
+                'fert_limit': fert_limit,
+                'pop_size': pop_size,
+                'n_gens': epoch_gens,
+                'population': populations[i],
+                'totals': totals[i],
+                'state': states[i],
+                'rng_state': rng_states[i],
+                'params': params[i],
+            } for i in range(n_islands)]
+            if executor is not None:
+                outs = list(executor.map(_island_epoch, tasks))
+            else:
+                outs = [_island_epoch(t) for t in tasks]
+            gen += epoch_gens
+
+            fitnesses = []
+            for i, out in enumerate(outs):
+                rng_states[i] = out['rng_state']
+                populations[i] = out['population']
+                totals[i] = out['totals']
+                fitnesses.append(out['fitnesses'])
+                # a próxima época continua de onde esta parou; a taxa base não muda
+                states[i] = out['state']
+                info = islands[i]
+                info['mutation_rate'] = out['mutation_rate']
+                for key, values in out['history'].items():
+                    info['history'].setdefault(key, []).extend(values)
+                info['time_seconds'] += out['time_seconds']
+                if out['best_fitness'] > info['best_fitness']:
+                    info['best_fitness'] = out['best_fitness']
+                    bests[i] = out['best']
+
+            if gen < n_gens and n_islands > 1 and n_migrants > 0:
+                # emigrantes escolhidos antes de qualquer substituição
+                emigrants = [np.argsort(-f, kind='stable')[:n_migrants] for f in fitnesses]
+                sources = _migration_sources(n_islands, topology, migration_rng)
+                new_pops = [p.copy() for p in populations]
+                new_totals = [t.copy() for t in totals]
+                for d, srcs in enumerate(sources):
+                    if not srcs:
+                        continue
+                    mig_pop = np.concatenate([populations[s][emigrants[s]] for s in srcs])
+                    mig_fit = np.concatenate([fitnesses[s][emigrants[s]] for s in srcs])
+                    mig_tot = np.concatenate([totals[s][emigrants[s]] for s in srcs])
+                    mig_src = np.repeat(srcs, [len(emigrants[s]) for s in srcs])
+                    k = min(len(mig_pop), pop_size // 2)
+                    order = np.argsort(-mig_fit, kind='stable')[:k]
+                    worst = np.argsort(fitnesses[d], kind='stable')[:k]
+                    new_pops[d][worst] = mig_pop[order]
+                    new_totals[d][worst] = mig_tot[order]
+                    migrations['events'] += 1
+                    migrations['individuals'] += k
+                    migrations['accepted'] += int(np.sum(mig_fit[order] > fitnesses[d][worst]))
+                    islands[d]['migrants_in'] += k
+                    # só contam os emigrantes que couberam no destino
+                    for s, count in zip(*np.unique(mig_src[order], return_counts=True)):
+                        islands[s]['migrants_out'] += int(count)
+                populations = new_pops
+                totals = new_totals
+            if verbose:
+                epoch_best = max(out['best_fitness'] for out in outs)
+                print(f"Geração {gen:4d}: melhor fitness entre ilhas = {epoch_best:.2f}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    best_island = int(np.argmax([info['best_fitness'] for info in islands]))
+    n_hist = min(len(info['history']['best_fitness']) for info in islands)
+    history = {
+        'best_fitness': [max(info['history']['best_fitness'][g] for info in islands) for g in range(n_hist)],
+        'mean_fitness': [float(np.mean([info['history']['mean_fitness'][g] for info in islands])) for g in range(n_hist)],
+    }
+    result = {
+        'best': bests[best_island],
+        'best_fitness': islands[best_island]['best_fitness'],
+        'best_island': best_island,
+        'time_seconds': time.perf_counter() - start_time,
+        'history': history,
+        'islands': islands,
+        'migrations': migrations,
+        'topology': topology,
+        'seed': seed,
+    }
+    return bests[best_island], result
@@ -0,0 +1,262 @@
+"""Modo multiobjetivo (NSGA-II): frente de Pareto de lucro líquido, risco e água.
+
+Reaproveita os operadores do GA (`generate_offspring`, reparo e seeding de
+`ga_core`); mudam a seleção de pais (torneio binário por frente e aglomeração)
+e a de sobreviventes: ordenação não dominada + distância de aglomeração sobre
+pais e filhos juntos. Orçamento,
+água e fertilizante continuam como restrições (dominância com restrições de
+Deb): viável domina inviável e, entre inviáveis, vence a menor violação.
+"""
+from typing import Tuple, Dict, Any, Optional, Callable
+import time
+import numpy as np
+
+try:
+    from .ga_core import (
+        build_attribute_matrix, init_population, init_packed_population, unpack_population,
+        population_totals, packed_population_totals, generate_offspring, repair_order,
+        repair_population, seed_population, REVENUE, COST, WATER, FERT, RISK
+    )
+except Exception:
+    from ga_core import (
+        build_attribute_matrix, init_population, init_packed_population, unpack_population,
+        population_totals, packed_population_totals, generate_offspring, repair_order,
+        repair_population, seed_population, REVENUE, COST, WATER, FERT, RISK
+    )
+
+
+# Objetivos da frente, na ordem das colunas de `objectives`
+NSGA_OBJECTIVES = ('net_profit', 'risk', 'water')
+
+# Elementos (linhas x colunas) por bloco da matriz de dominância
+_DOMINANCE_BLOCK = 1 << 22
+
+
+def objectives_from_totals(totals: np.ndarray) -> np.ndarray:
+    """Objetivos (lucro líquido, risco, água) de cada linha de `totals`."""
+    return np.column_stack([totals[:, REVENUE] - totals[:, COST], totals[:, RISK], totals[:, WATER]])
+
+
+def constraint_violation(totals: np.ndarray, budget: float, water_limit: float, fert_limit: float) -> np.ndarray:
+    """Soma dos excessos relativos de orçamento, água e fertilizante (0 = viável)."""
+    limits = np.maximum(np.array([budget, water_limit, fert_limit], dtype=np.float64), 1e-12)
+    excess = totals[:, [COST, WATER, FERT]] - limits
+    return (np.maximum(excess, 0.0) / limits).sum(axis=1)
+
+
+def dominance_matrix(F: np.ndarray, violation: Optional[np.ndarray] = None) -> np.ndarray:
+    """`D[i, j]` = i domina j, com F em minimização e dominância com restrições.
+
+    Calculada em blocos de linhas para limitar a memória intermediária.
+    """
+    n = len(F)
+    if violation is None:
+        violation = np.zeros(n)
+    feasible = violation <= 0
+    D = np.empty((n, n), dtype=bool)
+    cols = [np.ascontiguousarray(F[:, k]) for k in range(F.shape[1])]
+    step = max(1, _DOMINANCE_BLOCK // max(1, n))
+    for start in range(0, n, step):
+        stop = min(n, start + step)
+        # um objetivo por vez: só matrizes 2D de bool no bloco
+        le = np.ones((stop - start, n), dtype=bool)
+        lt = np.zeros((stop - start, n), dtype=bool)
+        for f in cols:
+            a = f[start:stop, None]
+            le &= a <= f
+            lt |= a < f
+        pareto = le & lt
+        if feasible.all():
+            D[start:stop] = pareto
+        else:
+            both = feasible[start:stop, None] & feasible
+            D[start:stop] = np.where(both, pareto, violation[start:stop, None] < violation)
+    return D
+
+
+def non_dominated_sort(F: np.ndarray, violation: Optional[np.ndarray] = None) -> np.ndarray:
+    """Rank de frente (0 = não dominado) de cada linha de `F` (minimização).
+
+    Conta quantos dominam cada ponto a partir da matriz de dominância e retira
+    frente a frente, subtraindo de uma vez as dominâncias da frente retirada.
+    """
+    n = len(F)
+    ranks = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return ranks
+    D = dominance_matrix(F, violation)
+    dominated_by = np.count_nonzero(D, axis=0)
+    front = np.flatnonzero(dominated_by == 0)
+    rank = 0
+    while len(front):
+        ranks[front] = rank
+        dominated_by[front] = -1
+        dominated_by -= np.count_nonzero(D[front], axis=0)
+        front = np.flatnonzero(dominated_by == 0)
+        rank += 1
+    return ranks
+
+
+def crowding_distance(F: np.ndarray, ranks: np.ndarray) -> np.ndarray:
+    """Distância de aglomeração de cada ponto dentro da sua frente (extremos = inf)."""
+    n, m = F.shape
+    dist = np.zeros(n)
+    # ordena por (rank, objetivo): cada frente vira um trecho contíguo
+    for k in range(m):
+        order = np.lexsort((F[:, k], ranks))
+        r = ranks[order]
+        f = F[order, k]
+        first = np.r_[True, r[1:] != r[:-1]]
+        last = np.r_[r[1:] != r[:-1], True]
+        starts = np.maximum.accumulate(np.where(first, np.arange(n), 0))
+        ends = np.minimum.accumulate(np.where(last, np.arange(n), n - 1)[::-1])[::-1]
+        span = f[ends] - f[starts]
+        gap = np.zeros(n)
+        inner = ~(first | last)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gap[inner] = np.where(span[inner] > 0, (f[2:] - f[:-2])[inner[1:-1]] / span[inner], 0.0)
+        gap[first | last] = np.inf
+        dist[order] += gap
+    return dist
+
+
+def _survivors(ranks: np.ndarray, crowd: np.ndarray, n: int) -> np.ndarray:
+    # menor rank primeiro; dentro da frente, maior distância de aglomeração
+    return np.lexsort((-crowd, ranks))[:n]
+
+
+def _tournament(ranks: np.ndarray, crowd: np.ndarray, n: int, rng: np.random.Generator) -> np.ndarray:
+    # torneio binário por (rank, aglomeração), todo de uma vez
+    a = rng.integers(0, len(ranks), size=n)
+    b = rng.integers(0, len(ranks), size=n)
+    a_wins = (ranks[a] < ranks[b]) | ((ranks[a] == ranks[b]) & (crowd[a] >= crowd[b]))
+    return np.where(a_wins, a, b)
+
+
+def run_nsga2(
+    prod: np.ndarray,
+    cost: np.ndarray,
+    water: np.ndarray,
+    fert: np.ndarray,
+    price: np.ndarray,
+    risk: np.ndarray,
+    budget: float,
+    water_limit: float,
+    fert_limit: float,
+    pop_size: int = 100,
+    n_gens: int = 200,
+    mutation_rate: float = 0.01,
+    crossover_method: str = 'uniform',
+    mutation_method: str = 'bit_flip',
+    rng: Optional[np.random.Generator] = None,
+    packed: bool = False,
+    repair_violations: bool = False,
+    seeding: float = 0.0,
+    verbose: bool = False,
+    callback: Optional[Callable[[Dict[str, Any]], Optional[bool]]] = None
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """NSGA-II sobre (lucro líquido, risco, água); retorna `(front, result)`.
+
+    `front` traz os cromossomos (desempacotados) da frente de Pareto final, sem
+    duplicatas, e `result['objectives']` os objetivos de cada um, nas colunas de
+    NSGA_OBJECTIVES. `callback` recebe um snapshot por geração; True encerra.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    n_items = len(prod)
+    attrs = build_attribute_matrix(prod, cost, water, fert, price, risk)
+    totals_fn = packed_population_totals if packed else population_totals
+    packed_length = n_items if packed else None
+    order = repair_order(attrs, budget, water_limit, fert_limit) if repair_violations else None
+    counters = {'generations': 0, 'evaluations': 0, 'repairs': 0}
+
+    def evaluate(block):
+        if repair_violations:
+            changed = repair_population(block, attrs, budget, water_limit, fert_limit, order=order, packed=packed)
+            counters['repairs'] += int(changed.sum())
+        counters['evaluations'] += len(block)
+        totals = totals_fn(block, attrs)
+        return totals, objectives_from_totals(totals), constraint_violation(totals, budget, water_limit, fert_limit)
+
+    if seeding > 0:
+        pop = seed_population(pop_size, attrs, budget, water_limit, fert_limit, rng, fraction=seeding, packed=packed)
+    else:
+        pop = (init_packed_population if packed else init_population)(pop_size, n_items, rng)
+    totals, objs, viol = evaluate(pop)
+    # F em minimização: -lucro, risco, água
+    sign = np.array([-1.0, 1.0, 1.0])
+    ranks = non_dominated_sort(objs * sign, viol)
+    crowd = crowding_distance(objs * sign, ranks)
+    n_pairs = (pop_size + 1) // 2
+    children = np.empty_like(pop)
+    history = {'front_size': [], 'best_profit': [], 'min_risk': [], 'min_water': []}
+    stop_reason = 'n_gens'
+    start_time = time.perf_counter()
+    for gen in range(n_gens):
+        parents = _tournament(ranks, crowd, 2 * n_pairs, rng)
+        generate_offspring(
+            pop, parents.reshape(n_pairs, 2), rng,
+            crossover_method=crossover_method,
+            mutation_method=mutation_method,
+            mutation_rate=mutation_rate,
+            out=children,
+            packed_length=packed_length
+        )
+        c_totals, c_objs, c_viol = evaluate(children)
+        # (mu + lambda): pais e filhos disputam as vagas
+        all_pop = np.concatenate([pop, children])
+        all_totals = np.concatenate([totals, c_totals])
+        all_objs = np.concatenate([objs, c_objs])
+        all_viol = np.concatenate([viol, c_viol])
+        all_ranks = non_dominated_sort(all_objs * sign, all_viol)
+        all_crowd = crowding_distance(all_objs * sign, all_ranks)
+        keep = _survivors(all_ranks, all_crowd, pop_size)
+        pop, totals, objs, viol = all_pop[keep], all_totals[keep], all_objs[keep], all_viol[keep]
+        # ranks continuam válidos na população sobrevivente; a aglomeração é recalculada
+        ranks = all_ranks[keep]
+        crowd = crowding_distance(objs * sign, ranks)
+        counters['generations'] += 1
+
+        front_mask = (ranks == 0) & (viol <= 0)
+        front_objs = objs[front_mask] if front_mask.any() else objs[ranks == 0]
+        history['front_size'].append(int(front_mask.sum()))
+        history['best_profit'].append(float(front_objs[:, 0].max()))
+        history['min_risk'].append(float(front_objs[:, 1].min()))
+        history['min_water'].append(float(front_objs[:, 2].min()))
+        if verbose and (gen % 10 == 0 or gen == n_gens - 1):
+            print(f"Geração {gen:3d}: frente com {history['front_size'][-1]} soluções, maior lucro = {history['best_profit'][-1]:.2f}")
+        if callback is not None:
+            snapshot = {
+                'generation': gen,
+                'front_size': history['front_size'][-1],
+                'best_profit': history['best_profit'][-1],
+                'evaluations': counters['evaluations'],
+                'elapsed': time.perf_counter() - start_time,
+            }
+            if callback(snapshot):
+                stop_reason = 'callback'
+                break
+
+    # frente final: rank 0 viável (ou a menos inviável, se nenhuma for viável), sem duplicatas
+    front_idx = np.flatnonzero((ranks == 0) & (viol <= 0))
+    if not len(front_idx):
+        front_idx = np.flatnonzero(ranks == 0)
+    _, first = np.unique(pop[front_idx], axis=0, return_index=True)
+    front_idx = front_idx[np.sort(first)]
+    front_idx = front_idx[np.argsort(-objs[front_idx, 0], kind='stable')]
+    front = pop[front_idx]
+    if packed:
+        front = unpack_population(front, n_items)
+    result = {
+        'front': front,
+        'objectives': objs[front_idx],
+        'objective_names': NSGA_OBJECTIVES,
+        'totals': totals[front_idx],
+        'feasible': viol[front_idx] <= 0,
+        'time_seconds': time.perf_counter() - start_time,
+        'history': history,
+        'population': pop,
+        'counters': counters,
+        'stop_reason': stop_reason,
+    }
+    return front, result
@@ -0,0 +1,576 @@
+"""Serviço local de otimização: processo de longa duração que recebe jobs do GA.
+
+Mantém os datasets abertos (memmap do cache colunar) e um pool de processos já
+aquecido, então cada job paga só o tempo do próprio GA. O protocolo é JSON por
+linha sobre um socket Unix (ou TCP em localhost): cada mensagem tem um `op` e
+cada resposta é uma linha JSON. Os jobs usam o mesmo formato de config de
+`experiments.py`.
+
+Operações:
+    {"op": "submit", "config": {...}, "kind": "run_ga" | "grid_search"} -> {"ok": true, "job": id}
+    {"op": "run", "config": {...}}      submit + progresso + resultado na mesma conexão
+    {"op": "watch", "job": id}          linhas {"event": "progress"} até {"event": "result"}
+    {"op": "result", "job": id}         espera o fim do job e devolve o resultado
+    {"op": "status", "job": id} | {"op": "list"} | {"op": "cancel", "job": id}
+    {"op": "ping"} | {"op": "shutdown"}
+
+Uso:
+    python -m src.service serve --socket /tmp/farm-ga.sock --workers 4
+    python -m src.service run --config configs/baseline.json --socket /tmp/farm-ga.sock
+"""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterator, Tuple
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import multiprocessing as mp
+import os
+import socket
+import threading
+import time
+import numpy as np
+
+try:
+    from .experiments import load_datasets, run_single_experiment, ga_kwargs_from_config
+    from .ga_core import run_ga_grid_search
+except Exception:
+    from experiments import load_datasets, run_single_experiment, ga_kwargs_from_config
+    from ga_core import run_ga_grid_search
+
+
+JOB_KINDS = ('run_ga', 'grid_search')
+JOB_STATES = ('queued', 'running', 'done', 'failed', 'cancelled')
+# Flags de cancelamento compartilhadas com os workers (um slot por job, reciclados)
+_CANCEL_SLOTS = 4096
+# Limite de uma linha do protocolo
+_MAX_LINE = 1 << 24
+# Argumentos de run_ga que a busca em grade define por conta própria
+_GRID_CONTROLLED = (
+    'selection_method', 'crossover_method', 'mutation_method', 'cache',
+    'adaptive_operators', 'checkpoint_path', 'resume_from'
+)
+
+# Estado de cada processo worker, montado em _init_service_worker
+_PROGRESS = None
+_CANCEL = None
+_WORKER_DATA: Dict[Tuple[str, Optional[int], Optional[int]], Any] = {}
+
+
+def _init_service_worker(progress_queue, cancel_flags):
+    global _PROGRESS, _CANCEL
+    _PROGRESS = progress_queue
+    _CANCEL = cancel_flags
+
+
+def _warmup() -> int:
+    return os.getpid()
+
+
+def _dataset_key(cfg: dict) -> Tuple[str, Optional[int], Optional[int]]:
+    # caminho + mtime + tamanho: um arquivo reescrito vira outra chave
+    data_path = cfg.get('data_path', 'data/farm_data_seed42.csv')
+    try:
+        st = os.stat(data_path)
+    except OSError:
+        return data_path, None, None
+    return data_path, st.st_mtime_ns, st.st_size
+
+
+def _worker_dataset(cfg: dict):
+    # cada worker abre o dataset uma vez (memmap) e o mantém entre jobs, enquanto o arquivo não mudar
+    key = _dataset_key(cfg)
+    if key not in _WORKER_DATA:
+        for old in [k for k in _WORKER_DATA if k[0] == key[0]]:
+            del _WORKER_DATA[old]
+        _WORKER_DATA[key] = load_datasets([cfg])[key[0]]
+    return _WORKER_DATA[key]
+
+
+def _service_job(job_id: int, slot: int, kind: str, cfg: dict, progress_interval: float) -> Dict[str, Any]:
+    """Roda um job no worker, publicando início e progresso na fila compartilhada."""
+    started = time.time()
+    _PROGRESS.put((job_id, 'started', {'pid': os.getpid(), 'started_at': started}))
+    data = _worker_dataset(cfg)
+    load_seconds = time.time() - started
+    last = [0.0]
+
+    def callback(snapshot):
+        if _CANCEL[slot]:
+            return True
+        now = time.perf_counter()
+        if now - last[0] >= progress_interval:
+            last[0] = now
+            _PROGRESS.put((job_id, 'progress', snapshot))
+        return False
+
+    if kind == 'grid_search':
+        # mesmo mapeamento config -> run_ga dos experimentos; operadores, cache e
+        # checkpoints ficam com a busca em grade
+        kwargs = ga_kwargs_from_config(cfg, data)
+        for key in _GRID_CONTROLLED:
+            kwargs.pop(key)
+        # run_ga_grid_search sempre imprime o resumo; a saída do worker é descartada
+        with contextlib.redirect_stdout(io.StringIO()):
+            best, res = run_ga_grid_search(
+                *data[:6],
+                verbose=False,
+                cache_size=cfg.get('cache_size', 0),
+                cache_bytes=cfg.get('cache_bytes'),
+                seed=cfg.get('seed'),
+                n_repeats=cfg.get('n_repeats', 1),
+                callback=callback,
+                **kwargs
+            )
+        out = {
+            'config': cfg,
+            'best_fitness': float(res['best_fitness']),
+            'time_seconds': float(res['time_seconds']),
+            'selection_method': res['selection'],
+            'crossover_method': res['crossover'],
+            'mutation_method': res['mutation'],
+            'best_vector': np.asarray(best).tolist(),
+            'grid': res['grid'],
+        }
+    else:
+        out = run_single_experiment(cfg, data, verbose=False, callback=callback)
+    out['cancelled'] = bool(_CANCEL[slot])
+    out['load_seconds'] = load_seconds
+    out['started_at'] = started
+    out['pid'] = os.getpid()
+    return out
+
+
+def _json_default(obj):
+    # tipos numpy que escapam nos resultados
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Tipo não serializável: {type(obj).__name__}")
+
+
+def _encode(msg: Dict[str, Any]) -> bytes:
+    return json.dumps(msg, default=_json_default).encode('utf-8') + b'\n'
+
+
+class OptimizationService:
+    """Fila de jobs sobre um pool de processos aquecido, com progresso e cancelamento.
+
+    Os jobs entram na fila do próprio executor; o estado (`queued`, `running`,
+    `done`, `failed`, `cancelled`) e os tempos ficam no processo do serviço.
+    """
+
+    def __init__(self, workers: int = 1, progress_interval: float = 0.2, keep_finished: int = 1000):
+        self.workers = max(1, workers)
+        self.progress_interval = progress_interval
+        self.keep_finished = keep_finished
+        self.jobs: Dict[int, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+        self._prepared = set()
+        self._ctx = mp.get_context()
+        self._progress = self._ctx.Queue()
+        self._cancel = self._ctx.RawArray('b', _CANCEL_SLOTS)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pump: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._socket_path: Optional[str] = None
+        self._stopped: Optional[asyncio.Event] = None
+
+    # --- ciclo de vida ---
+
+    async def start(self, socket_path: Optional[str] = None, host: str = '127.0.0.1', port: Optional[int] = None,
+                    preload=()):
+        """Sobe o pool (um job vazio por worker para forçar o fork), abre os datasets e o socket."""
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._executor = self._new_executor()
+        await asyncio.gather(*(self._loop.run_in_executor(self._executor, _warmup) for _ in range(self.workers)))
+        for cfg in preload:
+            await self._prepare(cfg)
+        self._pump = threading.Thread(target=self._pump_progress, daemon=True)
+        self._pump.start()
+        if socket_path is not None:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(socket_path)
+            self._server = await asyncio.start_unix_server(self._handle, path=socket_path, limit=_MAX_LINE)
+            self._socket_path = socket_path
+        else:
+            self._server = await asyncio.start_server(self._handle, host=host, port=port or 0, limit=_MAX_LINE)
+        return self._server
+
+    async def serve_forever(self):
+        await self._stopped.wait()
+        await self.close()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._socket_path is not None:
+            # o arquivo do socket fica no disco após o close; sem removê-lo, o próximo start falha
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self._socket_path)
+            self._socket_path = None
+        for job in self.jobs.values():
+            if job['status'] in ('queued', 'running'):
+                self.cancel(job['id'])
+        if self._executor is not None:
+            await self._loop.run_in_executor(None, self._executor.shutdown)
+            self._executor = None
+        if self._pump is not None:
+            self._progress.put(None)
+            await self._loop.run_in_executor(None, self._pump.join)
+            self._pump = None
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_service_worker, initargs=(self._progress, self._cancel)
+        )
+
+    # --- jobs ---
+
+    async def _prepare(self, cfg: dict):
+        # gera o dataset (e o cache colunar) no processo do serviço, uma vez por versão
+        # do arquivo, para os workers só abrirem o memmap
+        if _dataset_key(cfg) not in self._prepared:
+            await self._loop.run_in_executor(None, load_datasets, [cfg])
+            self._prepared.add(_dataset_key(cfg))
+
+    def _submit_job(self, *args):
+        # um worker que morreu quebra o pool inteiro: o pool é recriado e o envio repetido uma vez
+        executor = self._executor
+        try:
+            return executor.submit(_service_job, *args)
+        except BrokenProcessPool:
+            if self._executor is executor:
+                executor.shutdown(wait=False)
+                self._executor = self._new_executor()
+            return self._executor.submit(_service_job, *args)
+
+    async def submit(self, cfg: dict, kind: str = 'run_ga') -> Dict[str, Any]:
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Tipo de job desconhecido: {kind}")
+        if not isinstance(cfg, dict):
+            raise ValueError("config deve ser um objeto JSON")
+        job_id = next(self._ids)
+        slot = job_id % _CANCEL_SLOTS
+        self._cancel[slot] = 0
+        job = {
+            'id': job_id,
+            'kind': kind,
+            'config': cfg,
+            'status': 'queued',
+            'submitted_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'pid': None,
+            'progress': None,
+            'result': None,
+            'error': None,
+            'future': None,
+            'watchers': set(),
+            'done': asyncio.Event(),
+        }
+        self.jobs[job_id] = job
+        try:
+            await self._prepare(cfg)
+        except Exception as exc:
+            self._finish(job, 'failed', error=f"{type(exc).__name__}: {exc}")
+            return job
+        if job['status'] == 'cancelled':
+            return job
+        try:
+            future = self._submit_job(job_id, slot, kind, cfg, self.progress_interval)
+        except (BrokenProcessPool, RuntimeError) as exc:
+            # pool irrecuperável ou já encerrado: o job não fica 'queued' para sempre
+            self._finish(job, 'failed', error=f"{type(exc).__name__}: {exc}")
+            return job
+        job['future'] = future
+        future.add_done_callback(lambda f: self._loop.call_soon_threadsafe(self._on_done, job_id, f))
+        self._forget_old()
+        return job
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancela um job: se ainda na fila, sai dela; se rodando, para na próxima geração.
+
+        Uma busca em grade cancelada devolve o resumo das execuções feitas até ali.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job['status'] not in ('queued', 'running'):
+            return False
+        self._cancel[job_id % _CANCEL_SLOTS] = 1
+        future = job['future']
+        if future is None or future.cancel():
+            self._finish(job, 'cancelled')
+        return True
+
+    def _forget_old(self):
+        finished = [j for j in self.jobs.values() if j['status'] not in ('queued', 'running')]
+        for job in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job['id']]
+
+    def _pump_progress(self):
+        # thread: repassa as mensagens dos workers para o loop do asyncio
+        while True:
+            msg = self._progress.get()
+            if msg is None:
+                return
+            self._loop.call_soon_threadsafe(self._on_progress, *msg)
+
+    def _on_progress(self, job_id: int, event: str, payload: Dict[str, Any]):
+        job = self.jobs.get(job_id)
+        if job is None or job['status'] not in ('queued', 'running'):
+            return
+        if event == 'started':
+            job['status'] = 'running'
+            job['started_at'] = payload['started_at']
+            job['pid'] = payload['pid']
+        else:
+            job['progress'] = payload
+        self._notify(job, {'event': event, 'job': job_id, **({} if event == 'started' else {'progress': payload})})
+
+    def _on_done(self, job_id: int, future):
+        job = self.jobs.get(job_id)
+        if job is None or job['status'] not in ('queued', 'running'):
+            return
+        if future.cancelled():
+            self._finish(job, 'cancelled')
+            return
+        exc = future.exception()
+        if exc is not None:
+            self._finish(job, 'failed', error=f"{type(exc).__name__}: {exc}")
+            return
+        result = future.result()
+        # a mensagem de início pode chegar depois do fim do job
+        if job['started_at'] is None:
+            job['started_at'], job['pid'] = result['started_at'], result['pid']
+        self._finish(job, 'cancelled' if result.get('cancelled') else 'done', result=result)
+
+    def _finish(self, job: Dict[str, Any], status: str, result=None, error=None):
+        job['status'] = status
+        job['finished_at'] = time.time()
+        job['result'] = result
+        job['error'] = error
+        job['done'].set()
+        self._notify(job, self.result_message(job))
+
+    def _notify(self, job: Dict[str, Any], msg: Dict[str, Any]):
+        for queue in job['watchers']:
+            queue.put_nowait(msg)
+
+    # --- mensagens ---
+
+    def summary(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Estado do job sem o resultado completo, com os tempos de fila e de execução."""
+        submitted, started, finished = job['submitted_at'], job['started_at'], job['finished_at']
+        now = time.time()
+        timing = {
+            'submitted_at': submitted,
+            'started_at': started,
+            'finished_at': finished,
+            'queue_seconds': (started if started is not None else (finished or now)) - submitted,
+            'run_seconds': None if started is None else (finished or now) - started,
+            'total_seconds': (finished or now) - submitted,
+        }
+        if job['result'] is not None:
+            timing['ga_seconds'] = job['result'].get('time_seconds')
+            timing['load_seconds'] = job['result'].get('load_seconds')
+        return {
+            'job': job['id'],
+            'kind': job['kind'],
+            'status': job['status'],
+            'pid': job['pid'],
+            'progress': job['progress'],
+            'error': job['error'],
+            'timing': timing,
+        }
+
+    def result_message(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        return dict(self.summary(job), event='result', ok=job['status'] == 'done', result=job['result'])
+
+    async def _stream(self, job: Dict[str, Any], writer: asyncio.StreamWriter):
+        # progresso até o resultado final; quem chega depois do fim recebe só o resultado
+        if job['done'].is_set():
+            writer.write(_encode(self.result_message(job)))
+            return
+        queue: asyncio.Queue = asyncio.Queue()
+        job['watchers'].add(queue)
+        try:
+            while True:
+                msg = await queue.get()
+                writer.write(_encode(msg))
+                await writer.drain()
+                if msg['event'] == 'result':
+                    return
+        finally:
+            job['watchers'].discard(queue)
+
+    def _job(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        job = self.jobs.get(msg.get('job'))
+        if job is None:
+            raise ValueError(f"Job desconhecido: {msg.get('job')}")
+        return job
+
+    async def _dispatch(self, msg: Dict[str, Any], writer: asyncio.StreamWriter):
+        op = msg.get('op')
+        if op == 'ping':
+            reply = {'ok': True, 'pid': os.getpid(), 'workers': self.workers, 'jobs': len(self.jobs)}
+        elif op == 'submit':
+            job = await self.submit(msg.get('config', {}), msg.get('kind', 'run_ga'))
+            reply = dict(self.summary(job), ok=job['status'] != 'failed')
+        elif op == 'run':
+            job = await self.submit(msg.get('config', {}), msg.get('kind', 'run_ga'))
+            writer.write(_encode({'event': 'submitted', 'job': job['id'], 'ok': True}))
+            await self._stream(job, writer)
+            return
+        elif op == 'watch':
+            await self._stream(self._job(msg), writer)
+            return
+        elif op == 'result':
+            job = self._job(msg)
+            if msg.get('wait', True):
+                await job['done'].wait()
+            reply = self.result_message(job)
+        elif op == 'status':
+            reply = dict(self.summary(self._job(msg)), ok=True)
+        elif op == 'list':
+            reply = {'ok': True, 'jobs': [self.summary(job) for job in self.jobs.values()]}
+        elif op == 'cancel':
+            reply = {'ok': self.cancel(self._job(msg)['id']), 'job': msg.get('job')}
+        elif op == 'shutdown':
+            reply = {'ok': True}
+            self._stopped.set()
+        else:
+            raise ValueError(f"Operação desconhecida: {op}")
+        writer.write(_encode(reply))
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    msg = json.loads(line)
+                    if not isinstance(msg, dict):
+                        raise ValueError("mensagem deve ser um objeto JSON")
+                    await self._dispatch(msg, writer)
+                except (ValueError, TypeError) as exc:
+                    writer.write(_encode({'ok': False, 'error': str(exc)}))
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as exc:
+                    # erro inesperado vira resposta, sem derrubar a conexão em silêncio
+                    writer.write(_encode({'ok': False, 'error': f"{type(exc).__name__}: {exc}"}))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+
+async def serve(socket_path: Optional[str] = None, host: str = '127.0.0.1', port: Optional[int] = None,
+                workers: int = 1, progress_interval: float = 0.2, preload=()):
+    """Sobe o serviço e atende até receber `shutdown`."""
+    service = OptimizationService(workers=workers, progress_interval=progress_interval)
+    server = await service.start(socket_path=socket_path, host=host, port=port, preload=preload)
+    where = socket_path or '%s:%d' % server.sockets[0].getsockname()[:2]
+    print(f"Serviço de otimização em {where} ({service.workers} workers)", flush=True)
+    await service.serve_forever()
+
+
+# --- cliente ---
+
+def _connect(socket_path: Optional[str], host: str, port: Optional[int], timeout: Optional[float]) -> socket.socket:
+    if socket_path is not None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+    else:
+        sock = socket.create_connection((host, port), timeout=timeout)
+    return sock
+
+
+def stream(message: Dict[str, Any], socket_path: Optional[str] = None, host: str = '127.0.0.1',
+           port: Optional[int] = None, timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """Envia uma mensagem e gera as respostas, até a primeira que não seja de progresso."""
+    with _connect(socket_path, host, port, timeout) as sock, sock.makefile('rwb') as fh:
+        fh.write(_encode(message))
+        fh.flush()
+        for line in fh:
+            reply = json.loads(line)
+            yield reply
+            if reply.get('event') not in ('progress', 'started', 'submitted'):
+                return
+
+
+def request(message: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+    """Envia uma mensagem e devolve a resposta final."""
+    reply = None
+    for reply in stream(message, **kwargs):
+        pass
+    return reply
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name in ('serve', 'run', 'submit', 'status', 'result', 'cancel', 'list', 'shutdown'):
+        p = sub.add_parser(name)
+        p.add_argument('--socket', type=str, default=None, help='Socket Unix (padrão: TCP em --host/--port)')
+        p.add_argument('--host', type=str, default='127.0.0.1')
+        p.add_argument('--port', type=int, default=8765)
+        if name == 'serve':
+            p.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+            p.add_argument('--progress-interval', type=float, default=0.2, help='Segundos entre mensagens de progresso')
+            p.add_argument('--preload', type=str, default=None, help='Config cujos datasets já abrem na subida')
+        elif name in ('run', 'submit'):
+            p.add_argument('--config', type=str, default='configs/baseline.json')
+            p.add_argument('--kind', choices=JOB_KINDS, default='run_ga')
+        elif name in ('status', 'result', 'cancel'):
+            p.add_argument('job', type=int)
+    args = parser.parse_args()
+    conn = {'socket_path': args.socket, 'host': args.host, 'port': args.port}
+
+    if args.command == 'serve':
+        preload = []
+        if args.preload:
+            preload = json.loads(Path(args.preload).read_text())
+            preload = [preload] if isinstance(preload, dict) else preload
+        asyncio.run(serve(workers=args.workers, progress_interval=args.progress_interval, preload=preload, **conn))
+        return
+    if args.command in ('run', 'submit'):
+        cfgs = json.loads(Path(args.config).read_text())
+        cfgs = [cfgs] if isinstance(cfgs, dict) else cfgs
+        for cfg in cfgs:
+            msg = {'op': args.command, 'config': cfg, 'kind': args.kind}
+            for reply in stream(msg, **conn):
+                if reply.get('event') == 'progress':
+                    prog = reply['progress']
+                    run = f" (execução {prog['run'] + 1}/{prog['runs']})" if 'run' in prog else ''
+                    print(f"job {reply['job']}{run}: geração {prog.get('generation')}, best {prog.get('best_fitness', 0.0):.2f}")
+                elif reply.get('event') == 'result':
+                    timing = reply['timing']
+                    best = (reply['result'] or {}).get('best_fitness')
+                    print(f"job {reply['job']} {reply['status']}: best fitness {best}, "
+                          f"fila {timing['queue_seconds']:.3f} s, execução {timing['run_seconds'] or 0.0:.3f} s")
+                elif reply.get('event') not in ('submitted', 'started'):
+                    print(json.dumps(reply))
+        return
+    msg = {'op': args.command}
+    if args.command in ('status', 'result', 'cancel'):
+        msg['job'] = args.job
+    print(json.dumps(request(msg, **conn), indent=2))
+
+
+if __name__ == '__main__':
+    main()
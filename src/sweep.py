@@ -0,0 +1,184 @@
+"""Varredura de limites (orçamento, água, fertilizante) sobre o mesmo dataset.
+
+Os pontos da grade são ordenados para que limites vizinhos sejam resolvidos em
+sequência; cada execução começa da população final da anterior, reparada para
+os novos limites, e reaproveita os totais por indivíduo (só as penalidades
+mudam entre pontos).
+
+Uso:
+    python -m src.sweep --config configs/baseline.json --budget 800 1000 1200 --water 900 1200 --fert 400 600
+"""
+from pathlib import Path
+from typing import Tuple, Dict, Any, Optional, List, Sequence
+import argparse
+import csv
+import itertools
+import json
+import time
+import numpy as np
+
+try:
+    from .ga_core import (
+        run_ga, build_attribute_matrix, population_totals, repair_population, repair_order,
+        COST, WATER, FERT, REVENUE, RISK
+    )
+    from .experiments import load_datasets, ga_kwargs_from_config
+except Exception:
+    from ga_core import (
+        run_ga, build_attribute_matrix, population_totals, repair_population, repair_order,
+        COST, WATER, FERT, REVENUE, RISK
+    )
+    from experiments import load_datasets, ga_kwargs_from_config
+
+
+# Colunas da tabela de resultados da varredura
+SWEEP_FIELDS = [
+    'budget', 'water_limit', 'fert_limit', 'best_fitness', 'revenue', 'cost', 'water', 'fert', 'risk',
+    'n_selected', 'feasible', 'generations', 'evaluations', 'time_seconds', 'stop_reason'
+]
+
+
+def sweep_order(limits: Sequence[Tuple[float, float, float]]) -> List[int]:
+    """Ordem dos pontos: do mais folgado ao mais apertado, em zigue-zague.
+
+    Orçamento decrescente; dentro dele água e, dentro desta, fertilizante,
+    alternando o sentido a cada passo, de modo que em uma grade completa pontos
+    consecutivos difiram em um único limite.
+    """
+    pts = np.asarray(limits, dtype=np.float64).reshape(-1, 3)
+    # posição de cada valor entre os distintos da coluna, do maior para o menor
+    b, w, f = (np.unique(-pts[:, c], return_inverse=True)[1].ravel() for c in range(3))
+    n_w = int(w.max()) + 1 if len(w) else 0
+    w_pos = np.where(b % 2, n_w - 1 - w, w)
+    cell = b * n_w + w_pos
+    f_pos = np.where(cell % 2, -f, f)
+    return [int(i) for i in np.lexsort((f_pos, w_pos, b))]
+
+
+def run_constraint_sweep(
+    prod: np.ndarray,
+    cost: np.ndarray,
+    water: np.ndarray,
+    fert: np.ndarray,
+    price: np.ndarray,
+    risk: np.ndarray,
+    limits: Sequence[Tuple[float, float, float]],
+    warm_start: bool = True,
+    rng: Optional[np.random.Generator] = None,
+    verbose: bool = True,
+    **ga_kwargs
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Resolve cada `(budget, water_limit, fert_limit)` de `limits`; retorna `(table, result)`.
+
+    Com `warm_start`, cada ponto parte da população final do ponto anterior
+    (reparada com add-back para os novos limites) e dos seus totais; sem ele,
+    cada ponto parte do zero (útil como referência). `table` traz uma linha por
+    ponto, na ordem de `limits`; `result['solutions']` os melhores vetores.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    for key in ('budget', 'water_limit', 'fert_limit', 'rng', 'initial_population', 'initial_totals'):
+        if key in ga_kwargs:
+            raise ValueError(f"Parâmetro controlado pela varredura: {key}")
+    attrs = build_attribute_matrix(prod, cost, water, fert, price, risk)
+    packed = ga_kwargs.get('packed', False)
+    order = sweep_order(limits)
+    table: List[Optional[Dict[str, Any]]] = [None] * len(limits)
+    solutions = np.zeros((len(limits), len(prod)), dtype=np.int8)
+    pop = totals = None
+    start_time = time.perf_counter()
+    for step, idx in enumerate(order):
+        budget, water_limit, fert_limit = (float(v) for v in limits[idx])
+        init_kwargs = {}
+        if warm_start and pop is not None:
+            pop = pop.copy()
+            totals = totals.copy()
+            changed = repair_population(
+                pop, attrs, budget, water_limit, fert_limit,
+                order=repair_order(attrs, budget, water_limit, fert_limit), add_back=True, packed=packed
+            )
+            # linhas reparadas são reavaliadas pelo run_ga
+            totals[changed] = np.nan
+            init_kwargs = {'initial_population': pop, 'initial_totals': totals}
+        best, res = run_ga(
+            prod, cost, water, fert, price, risk,
+            budget=budget, water_limit=water_limit, fert_limit=fert_limit,
+            rng=rng, **init_kwargs, **ga_kwargs
+        )
+        pop, totals = res['population'], res['totals']
+        best_totals = population_totals(best[None, :], attrs)[0]
+        feasible = bool(
+            best_totals[COST] <= budget + 1e-9
+            and best_totals[WATER] <= water_limit + 1e-9
+            and best_totals[FERT] <= fert_limit + 1e-9
+        )
+        solutions[idx] = best
+        table[idx] = {
+            'budget': budget,
+            'water_limit': water_limit,
+            'fert_limit': fert_limit,
+            'best_fitness': float(res['best_fitness']),
+            'revenue': float(best_totals[REVENUE]),
+            'cost': float(best_totals[COST]),
+            'water': float(best_totals[WATER]),
+            'fert': float(best_totals[FERT]),
+            'risk': float(best_totals[RISK]),
+            'n_selected': int(best.sum()),
+            'feasible': feasible,
+            'generations': res['counters']['generations'],
+            'evaluations': res['counters']['evaluations'],
+            'time_seconds': float(res['time_seconds']),
+            'stop_reason': res['stop_reason'],
+        }
+        if verbose:
+            row = table[idx]
+            print(f"[{step + 1}/{len(limits)}] orçamento={budget:g} água={water_limit:g} fert={fert_limit:g}: "
+                  f"fitness {row['best_fitness']:.2f} em {row['generations']} gerações")
+    result = {
+        'solutions': solutions,
+        'order': order,
+        'generations': int(sum(row['generations'] for row in table)),
+        'evaluations': int(sum(row['evaluations'] for row in table)),
+        'time_seconds': time.perf_counter() - start_time,
+        'warm_start': warm_start,
+    }
+    return table, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--config', type=str, default='configs/baseline.json', help='Config base (dataset e parâmetros do GA)')
+    parser.add_argument('--budget', type=float, nargs='+', required=True)
+    parser.add_argument('--water', type=float, nargs='+', required=True)
+    parser.add_argument('--fert', type=float, nargs='+', required=True)
+    parser.add_argument('--cold', action='store_true', help='Cada ponto parte do zero (sem warm start)')
+    parser.add_argument('--out', type=str, default='results/sweep_results.csv')
+    args = parser.parse_args()
+
+    cfg = json.loads(Path(args.config).read_text())
+    if isinstance(cfg, list):
+        cfg = cfg[0]
+    data_path = cfg.get('data_path', 'data/farm_data_seed42.csv')
+    data = load_datasets([cfg])[data_path]
+    # mesmo mapeamento config -> run_ga dos experimentos; limites e checkpoints são por ponto
+    ga_kwargs = ga_kwargs_from_config(cfg, data)
+    for key in ('budget', 'water_limit', 'fert_limit', 'checkpoint_path', 'resume_from'):
+        ga_kwargs.pop(key)
+    limits = list(itertools.product(args.budget, args.water, args.fert))
+    table, result = run_constraint_sweep(
+        *data[:6], limits,
+        warm_start=not args.cold,
+        rng=np.random.default_rng(cfg.get('seed', None)),
+        **ga_kwargs
+    )
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, 'w', newline='', encoding='utf-8') as fh:
+        writer = csv.DictWriter(fh, fieldnames=SWEEP_FIELDS)
+        writer.writeheader()
+        writer.writerows(table)
+    print(f"{len(table)} pontos, {result['generations']} gerações no total; tabela salva em {out}")
+
+
+if __name__ == '__main__':
+    main()
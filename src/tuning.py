@@ -0,0 +1,287 @@
+"""Busca de hiperparâmetros por successive halving.
+
+Muitas configurações sorteadas do espaço de busca rodam poucas gerações; a cada
+rodada (rung) só a melhor fração `1/eta` continua, a partir da população, dos
+totais, do estado adaptativo do GA e do RNG salvos, com `eta` vezes mais gerações
+acumuladas.
+A configuração vencedora sai no formato dos configs de `experiments.py`.
+
+Uso:
+    python -m src.tuning --config configs/baseline.json --n-configs 81 --out configs/tuned.json
+"""
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Tuple, Dict, Any, Optional, List
+import argparse
+import json
+import math
+import time
+import numpy as np
+
+try:
+    from .ga_core import run_ga, SELECTION_METHODS, CROSSOVER_METHODS, MUTATION_METHODS
+    from .experiments import load_datasets, ga_kwargs_from_config, CONFIG_ALIASES
+except Exception:
+    from ga_core import run_ga, SELECTION_METHODS, CROSSOVER_METHODS, MUTATION_METHODS
+    from experiments import load_datasets, ga_kwargs_from_config, CONFIG_ALIASES
+
+
+# Espaço padrão, com as chaves dos configs de experimento. Lista = escolha entre
+# valores; dict = intervalo {'low', 'high'}, com 'log' para escala logarítmica
+# e 'int' para valores inteiros.
+SEARCH_SPACE = {
+    'selection': list(SELECTION_METHODS),
+    'crossover': list(CROSSOVER_METHODS),
+    'mutation': list(MUTATION_METHODS),
+    'mutation_rate': {'low': 0.001, 'high': 0.1, 'log': True},
+    'tournament_k': [2, 3, 5, 7],
+    'pop_size': [50, 100, 200],
+    'elitism': [0, 1, 2, 5],
+}
+
+# Dataset dos workers (enviado uma vez por processo)
+_TUNE_DATA: Optional[Tuple[np.ndarray, ...]] = None
+
+
+def sample_configs(space: Dict[str, Any], n_configs: int, rng: np.random.Generator) -> List[Dict[str, Any]]:
+    """Sorteia `n_configs` configurações do espaço de busca."""
+    configs = []
+    for _ in range(n_configs):
+        cfg = {}
+        for key, spec in space.items():
+            if isinstance(spec, dict):
+                low, high = spec['low'], spec['high']
+                if spec.get('log'):
+                    value = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+                else:
+                    value = float(rng.uniform(low, high))
+                cfg[key] = int(round(value)) if spec.get('int') else value
+            else:
+                value = spec[int(rng.integers(len(spec)))]
+                cfg[key] = value.item() if isinstance(value, np.generic) else value
+        configs.append(cfg)
+    return configs
+
+
+def _init_tune_worker(data: Tuple[np.ndarray, ...]):
+    global _TUNE_DATA
+    _TUNE_DATA = data
+
+
+def _tune_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Continua uma configuração por `n_gens` gerações."""
+    data = task.pop('data', None) or _TUNE_DATA
+    state = task.pop('state')
+    rng = np.random.default_rng()
+    rng.bit_generator.state = state['rng_state']
+    kwargs = {CONFIG_ALIASES.get(k, k): v for k, v in task.pop('config').items()}
+    # continua de onde a rodada anterior parou: população, totais e estado adaptativo
+    # (taxa de mutação corrente, estagnação, operadores); a taxa do config segue como base
+    best, res = run_ga(
+        *data, rng=rng, early_stop=False,
+        initial_population=state['population'],
+        initial_totals=state['totals'],
+        initial_state=state['ga_state'],
+        **kwargs, **task
+    )
+    return {
+        'best': best,
+        'best_fitness': float(res['best_fitness']),
+        'population': res['population'],
+        'totals': res['totals'],
+        'ga_state': res['state'],
+        'rng_state': rng.bit_generator.state,
+        'generations': res['counters']['generations'],
+        'evaluations': res['counters']['evaluations'],
+        'time_seconds': res['time_seconds'],
+    }
+
+
+def successive_halving(
+    prod: np.ndarray,
+    cost: np.ndarray,
+    water: np.ndarray,
+    fert: np.ndarray,
+    price: np.ndarray,
+    risk: np.ndarray,
+    budget: float,
+    water_limit: float,
+    fert_limit: float,
+    space: Optional[Dict[str, Any]] = None,
+    n_configs: int = 27,
+    min_gens: int = 10,
+    eta: int = 3,
+    max_gens: Optional[int] = None,
+    seed: Optional[int] = None,
+    n_workers: int = 1,
+    verbose: bool = True,
+    **ga_kwargs
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Successive halving sobre `run_ga`.
+
+    Na rodada r as sobreviventes acumulam `min_gens * eta**r` gerações (limitado a
+    `max_gens`); as `1/eta` melhores pela melhor fitness encontrada seguem. Para
+    quando resta uma configuração ou `max_gens` é atingido. Cada configuração tem
+    um RNG próprio derivado de `SeedSequence(seed)`, então o resultado não depende
+    de `n_workers`. `ga_kwargs` vale para todas as execuções (ex.: `packed`).
+
+    Retorna `(best_config, result)`: `best_config` no formato de config de
+    experimento e `result` com o `leaderboard` e o resumo de cada rodada.
+    """
+    if eta < 2:
+        raise ValueError("eta deve ser >= 2")
+    for key in ('rng', 'initial_population', 'initial_totals', 'initial_state', 'early_stop', 'n_gens'):
+        if key in ga_kwargs:
+            raise ValueError(f"Parâmetro controlado pelo tuner: {key}")
+    if seed is None:
+        seed = int(np.random.default_rng().integers(0, 2**63))
+    ss = np.random.SeedSequence(seed)
+    space_rng, *config_seeds = [np.random.default_rng(c) for c in ss.spawn(n_configs + 1)]
+    configs = sample_configs(space or SEARCH_SPACE, n_configs, space_rng)
+    data = (prod, cost, water, fert, price, risk)
+    limits = {'budget': budget, 'water_limit': water_limit, 'fert_limit': fert_limit}
+    states = [{
+        'population': None,
+        'totals': None,
+        'ga_state': None,
+        'rng_state': r.bit_generator.state,
+        'best': None,
+        'best_fitness': -np.inf,
+        'generations': 0,
+        'evaluations': 0,
+        'time_seconds': 0.0,
+        'rung': 0,
+    } for r in config_seeds]
+
+    alive = list(range(n_configs))
+    rungs = []
+    executor = None
+    start_time = time.perf_counter()
+    try:
+        if n_workers > 1:
+            executor = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_tune_worker, initargs=(data,))
+        rung = 0
+        while alive:
+            target = min_gens * eta ** rung
+            if max_gens is not None:
+                target = min(target, max_gens)
+            tasks = [dict(
+                config=configs[i],
+                state=states[i],
+                n_gens=target - states[i]['generations'],
+                **limits,
+                **ga_kwargs
+            ) for i in alive]
+            if executor is not None:
+                outs = list(executor.map(_tune_task, tasks))
+            else:
+                outs = [_tune_task(dict(t, data=data)) for t in tasks]
+            for i, out in zip(alive, outs):
+                st = states[i]
+                st['population'] = out['population']
+                st['totals'] = out['totals']
+                st['ga_state'] = out['ga_state']
+                st['rng_state'] = out['rng_state']
+                st['generations'] += out['generations']
+                st['evaluations'] += out['evaluations']
+                st['time_seconds'] += out['time_seconds']
+                st['rung'] = rung
+                if out['best_fitness'] > st['best_fitness']:
+                    st['best_fitness'] = out['best_fitness']
+                    st['best'] = out['best']
+
+            ranked = sorted(alive, key=lambda i: -states[i]['best_fitness'])
+            rungs.append({
+                'rung': rung,
+                'generations': target,
+                'configs': len(alive),
+                'best_fitness': states[ranked[0]]['best_fitness'],
+            })
+            if verbose:
+                print(f"Rodada {rung}: {len(alive)} configs com {target} gerações, melhor fitness {states[ranked[0]]['best_fitness']:.2f}")
+            if len(alive) == 1 or (max_gens is not None and target >= max_gens):
+                break
+            alive = ranked[:max(1, math.ceil(len(alive) / eta))]
+            rung += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # mais longe nas rodadas primeiro; dentro da mesma rodada, maior fitness
+    order = sorted(range(n_configs), key=lambda i: (-states[i]['rung'], -states[i]['best_fitness']))
+    leaderboard = [{
+        'config': configs[i],
+        'best_fitness': float(states[i]['best_fitness']),
+        'rung': states[i]['rung'],
+        'generations': states[i]['generations'],
+        'evaluations': states[i]['evaluations'],
+        'time_seconds': states[i]['time_seconds'],
+    } for i in order]
+    winner = order[0]
+    best_config = dict(configs[winner], n_gens=states[winner]['generations'], **limits)
+    result = {
+        'best': states[winner]['best'],
+        'best_fitness': float(states[winner]['best_fitness']),
+        'leaderboard': leaderboard,
+        'rungs': rungs,
+        'evaluations': int(sum(st['evaluations'] for st in states)),
+        'time_seconds': time.perf_counter() - start_time,
+        'seed': seed,
+    }
+    if verbose:
+        print("--- Melhor configuração encontrada ---")
+        print(json.dumps(best_config, indent=2))
+    return best_config, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--config', type=str, default='configs/baseline.json', help='Config base (dataset e limites)')
+    parser.add_argument('--space', type=str, default=None, help='JSON com o espaço de busca (padrão: SEARCH_SPACE)')
+    parser.add_argument('--n-configs', type=int, default=27)
+    parser.add_argument('--min-gens', type=int, default=10)
+    parser.add_argument('--eta', type=int, default=3)
+    parser.add_argument('--max-gens', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--out', type=str, default='configs/tuned.json', help='Config vencedor, pronto para experiments.py')
+    parser.add_argument('--leaderboard', type=str, default='results/tuning_leaderboard.json')
+    args = parser.parse_args()
+
+    base = json.loads(Path(args.config).read_text())
+    if isinstance(base, list):
+        base = base[0]
+    data_path = base.get('data_path', 'data/farm_data_seed42.csv')
+    data = load_datasets([base])[data_path]
+    space = json.loads(Path(args.space).read_text()) if args.space else None
+    # demais chaves do config base valem para todas as execuções (mesmo mapeamento dos
+    # experimentos), exceto as do espaço de busca e as controladas pelo tuner
+    ga_kwargs = ga_kwargs_from_config(base, data)
+    for key in ('n_gens', 'early_stop', 'checkpoint_path', 'resume_from', *(CONFIG_ALIASES.get(k, k) for k in space or SEARCH_SPACE)):
+        ga_kwargs.pop(key, None)
+    limits = {key: ga_kwargs.pop(key) for key in ('budget', 'water_limit', 'fert_limit')}
+    best_config, result = successive_halving(
+        *data[:6],
+        **limits,
+        space=space,
+        n_configs=args.n_configs,
+        min_gens=args.min_gens,
+        eta=args.eta,
+        max_gens=args.max_gens,
+        seed=args.seed,
+        n_workers=args.workers,
+        **ga_kwargs
+    )
+    # mantém dataset e demais chaves do config base
+    out_cfg = dict(base, **best_config)
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(out_cfg, indent=2))
+    lb_path = Path(args.leaderboard)
+    lb_path.parent.mkdir(parents=True, exist_ok=True)
+    lb_path.write_text(json.dumps({k: v for k, v in result.items() if k != 'best'}, indent=2))
+    print(f"Config vencedor salvo em {out_path}; leaderboard em {lb_path}")
+
+
+if __name__ == '__main__':
+    main()
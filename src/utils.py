@@ -1,12 +1,266 @@
 from pathlib import Path
+from typing import Tuple, Dict, Any, Optional, List
+import contextlib
+import hashlib
+import json
+import os
 import pandas as pd
 import numpy as np
 
 
-def load_data(path: str = 'data/farm_data_seed42.csv'):
+# Formato colunar binário: MAGIC, tamanho do cabeçalho (uint64 little-endian),
+# cabeçalho JSON e as colunas contíguas, cada uma alinhada em 64 bytes
+COLUMNAR_MAGIC = b'FARMCOL1'
+COLUMNAR_SUFFIX = '.bin'
+FLOAT_COLUMNS = ('prod', 'cost', 'water', 'fert', 'price', 'risk')
+CATEGORY_COLUMNS = ('soil_type', 'crop_type')
+# Códigos das categorias: int32 comporta qualquer número realista de valores distintos
+CATEGORY_DTYPE = np.dtype('<i4')
+_ALIGN = 64
+# Linhas por bloco ao converter o CSV
+_CSV_CHUNK_ROWS = 1 << 20
+# Bytes reservados no cabeçalho além do tamanho inicial
+_HEADER_SLACK = 4096
+
+
+def _align(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _file_hash(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 24), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _write_header(fh, header: Dict[str, Any], size: Optional[int] = None) -> int:
+    # `size` fixa o espaço do cabeçalho (completado com espaços) para regravá-lo no lugar
+    raw = json.dumps(header, sort_keys=True).encode('utf-8')
+    if size is not None:
+        if len(raw) > size:
+            raise ValueError("Cabeçalho colunar excedeu o espaço reservado")
+        raw = raw.ljust(size)
+    fh.seek(0)
+    fh.write(COLUMNAR_MAGIC)
+    fh.write(len(raw).to_bytes(8, 'little'))
+    fh.write(raw)
+    return _align(len(COLUMNAR_MAGIC) + 8 + len(raw))
+
+
+def read_columnar_header(path: str) -> Tuple[Dict[str, Any], int]:
+    """Lê o cabeçalho do arquivo colunar; retorna `(header, início dos dados)`."""
+    header, size = _read_header(path)
+    return header, _align(len(COLUMNAR_MAGIC) + 8 + size)
+
+
+def _read_header(path: str) -> Tuple[Dict[str, Any], int]:
+    with open(path, 'rb') as fh:
+        if fh.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"Arquivo colunar inválido: {path}")
+        size = int.from_bytes(fh.read(8), 'little')
+        header = json.loads(fh.read(size).decode('utf-8'))
+    return header, size
+
+
+def update_columnar_header(path: str, **fields):
+    """Regrava campos do cabeçalho no espaço reservado por `create_columnar`."""
+    header, size = _read_header(path)
+    header.update(fields)
+    with open(path, 'r+b') as fh:
+        _write_header(fh, header, size)
+
+
+def create_columnar(
+    path: str,
+    n: int,
+    categories: Dict[str, List[str]],
+    seed: Optional[int] = None,
+    source: Optional[Dict[str, Any]] = None
+) -> Dict[str, np.memmap]:
+    """Cria `path + '.tmp'` com espaço para `n` linhas e devolve memmaps graváveis das colunas.
+
+    Colunas float64 em FLOAT_COLUMNS e códigos CATEGORY_DTYPE em CATEGORY_COLUMNS (índices
+    em `categories[col]`). Depois de preencher, chame `finalize_columnar(path)`.
+    """
+    columns = {}
+    offset = 0
+    for name in FLOAT_COLUMNS + CATEGORY_COLUMNS:
+        dtype = np.dtype('<f8') if name in FLOAT_COLUMNS else CATEGORY_DTYPE
+        columns[name] = {'dtype': dtype.str, 'offset': offset}
+        offset = _align(offset + n * dtype.itemsize)
+    header = {
+        'version': 1,
+        'n': int(n),
+        'seed': seed,
+        'source': source,
+        'categories': {c: list(categories[c]) for c in CATEGORY_COLUMNS},
+        'columns': columns,
+        # preenchido em finalize_columnar
+        'content_hash': None,
+    }
+    tmp = str(path) + '.tmp'
+    # folga para categorias e hash gravados depois
+    reserve = len(json.dumps(header)) + _HEADER_SLACK
+    with open(tmp, 'wb') as fh:
+        data_start = _write_header(fh, header, reserve)
+        fh.truncate(data_start + offset)
+    return {
+        name: np.memmap(tmp, dtype=np.dtype(col['dtype']), mode='r+', offset=data_start + col['offset'], shape=(n,))
+        for name, col in columns.items()
+    }
+
+
+def finalize_columnar(path: str):
+    """Calcula o hash do conteúdo, grava no cabeçalho e publica o arquivo de forma atômica."""
+    tmp = str(path) + '.tmp'
+    header, data_start = read_columnar_header(tmp)
+    h = hashlib.blake2b(digest_size=16)
+    for name, col in header['columns'].items():
+        values = np.memmap(tmp, dtype=np.dtype(col['dtype']), mode='r', offset=data_start + col['offset'], shape=(header['n'],))
+        for start in range(0, header['n'], _CSV_CHUNK_ROWS):
+            h.update(values[start:start + _CSV_CHUNK_ROWS].tobytes())
+        del values
+    update_columnar_header(tmp, content_hash=h.hexdigest())
+    with open(tmp, 'r+b') as fh:
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+def read_columnar(path: str, mode: str = 'r') -> Tuple[Dict[str, Any], Dict[str, np.memmap]]:
+    """Abre o arquivo colunar; as colunas são memmaps (somente leitura por padrão, com páginas compartilhadas entre processos)."""
+    header, data_start = read_columnar_header(path)
+    columns = {
+        name: np.memmap(path, dtype=np.dtype(col['dtype']), mode=mode, offset=data_start + col['offset'], shape=(header['n'],))
+        for name, col in header['columns'].items()
+    }
+    return header, columns
+
+
+def _source_info(p: Path, digest: Optional[str] = None) -> Dict[str, Any]:
+    st = p.stat()
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'hash': digest or _file_hash(p)}
+
+
+def convert_csv(csv_path: str, out_path: Optional[str] = None) -> Path:
+    """Converte o CSV de `generate_and_save` para o formato colunar, em blocos de linhas."""
+    p = Path(csv_path)
+    out = Path(out_path) if out_path else csv_cache_path(p)
+    # uma passada para contar linhas e calcular o hash da fonte
+    h = hashlib.blake2b(digest_size=16)
+    n_lines = 0
+    last = b'\n'
+    with open(p, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 24), b''):
+            h.update(block)
+            n_lines += block.count(b'\n')
+            last = block[-1:]
+    n = n_lines - 1 + (last != b'\n')
+    source = dict(_source_info(p, h.hexdigest()), name=p.name)
+
+    codes: Dict[str, Dict[str, int]] = {c: {} for c in CATEGORY_COLUMNS}
+    seed = None
+    # os nomes das categorias só são conhecidos ao fim da leitura e vão para o cabeçalho no final
+    start = 0
+    columns = None
+    for df in pd.read_csv(p, chunksize=_CSV_CHUNK_ROWS):
+        if columns is None:
+            if 'seed' in df.columns and len(df):
+                seed = int(df['seed'].iloc[0])
+            columns = create_columnar(str(out), n, {c: [] for c in CATEGORY_COLUMNS}, seed=seed, source=source)
+        stop = start + len(df)
+        for name in FLOAT_COLUMNS:
+            columns[name][start:stop] = df[name].to_numpy(dtype=np.float64)
+        for name in CATEGORY_COLUMNS:
+            uniq, inv = np.unique(df[name].astype(str).to_numpy(), return_inverse=True)
+            mapping = codes[name]
+            ids = np.array([mapping.setdefault(u, len(mapping)) for u in uniq], dtype=CATEGORY_DTYPE)
+            columns[name][start:stop] = ids[inv]
+        start = stop
+    if columns is None:
+        columns = create_columnar(str(out), 0, {c: [] for c in CATEGORY_COLUMNS}, seed=seed, source=source)
+    for col in columns.values():
+        col.flush()
+    del columns
+    # categorias na ordem em que foram encontradas
+    update_columnar_header(str(out) + '.tmp', categories={c: list(codes[c]) for c in CATEGORY_COLUMNS})
+    finalize_columnar(str(out))
+    return out
+
+
+def csv_cache_path(csv_path) -> Path:
+    """Caminho do cache colunar de um CSV (`<nome>.csv.bin`), distinto de um `<stem>.bin` gerado direto."""
+    p = Path(csv_path)
+    return p.with_name(p.name + COLUMNAR_SUFFIX)
+
+
+def _is_csv_cache(cache: Path) -> bool:
+    # só arquivos criados por convert_csv trazem a impressão digital da fonte
+    try:
+        header, _ = read_columnar_header(str(cache))
+    except (ValueError, OSError):
+        return True  # corrompido ou ilegível: pode ser refeito
+    return 'hash' in (header.get('source') or {})
+
+
+def _columnar_is_fresh(cache: Path, source: Path) -> bool:
+    if not cache.exists():
+        return False
+    try:
+        header, _ = read_columnar_header(str(cache))
+    except (ValueError, OSError):
+        return False
+    info = header.get('source') or {}
+    st = source.stat()
+    if info.get('size') != st.st_size:
+        return False
+    # mtime igual: reaproveita sem ler a fonte; senão confere o hash do conteúdo
+    if info.get('mtime_ns') == st.st_mtime_ns:
+        return True
+    if info.get('hash') != _file_hash(source):
+        return False
+    # mesmo conteúdo com outro mtime (touch, checkout, cópia): grava o mtime novo
+    # para as próximas leituras não recalcularem o hash
+    with contextlib.suppress(OSError):
+        update_columnar_header(str(cache), source=dict(info, mtime_ns=st.st_mtime_ns))
+    return True
+
+
+def _data_from_columnar(path: Path):
+    # copy-on-write: arrays graváveis como os do CSV, sem alterar o arquivo; as
+    # páginas só são copiadas se alguém escrever nelas
+    header, columns = read_columnar(str(path), mode='c')
+    # categorias como arrays de str (object), os mesmos tipos da leitura do CSV
+    soil_type, crop_type = (
+        np.asarray(header['categories'][c], dtype=object)[np.asarray(columns[c])] for c in CATEGORY_COLUMNS
+    )
+    return (*(columns[c] for c in FLOAT_COLUMNS), soil_type, crop_type, header['seed'])
+
+
+def load_data(path: str = 'data/farm_data_seed42.csv', use_cache: bool = True):
+    """Lê o dataset; retorna `(prod, cost, water, fert, price, risk, soil_type, crop_type, seed)`.
+
+    Os tipos são os mesmos em qualquer caminho (CSV, cache colunar ou .bin):
+    arrays float64 graváveis e categorias como arrays de str (object).
+    """
     p = Path(path)
     if not p.exists():
         raise FileNotFoundError(f"Data file not found: {p.resolve()}")
+    if p.suffix == COLUMNAR_SUFFIX:
+        return _data_from_columnar(p)
+    if use_cache:
+        # cache colunar ao lado do CSV, refeito quando o CSV muda; colunas carregadas via memmap
+        cache = csv_cache_path(p)
+        try:
+            if not _columnar_is_fresh(cache, p):
+                # nunca sobrescreve um dataset colunar que não seja cache de CSV
+                if cache.exists() and not _is_csv_cache(cache):
+                    raise OSError(f"{cache} não é um cache de {p.name}")
+                convert_csv(str(p), str(cache))
+            return _data_from_columnar(cache)
+        except OSError:
+            pass  # diretório sem permissão de escrita (ou cache ocupado): lê o CSV direto
     df = pd.read_csv(p)
     # Espera colunas: area_id, prod, cost, water, fert, price, risk, soil_type, crop_type, seed
     prod = df['prod'].to_numpy()